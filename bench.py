@@ -0,0 +1,186 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from geometry import *
+
+
+SHAPE_FACTORIES = {
+    'Circle': lambda i: Circle(i % 100 + 1),
+    'Triangle': lambda i: Triangle(3 + i % 5, 4 + i % 5, 5 + i % 5),
+    'EquilateralTriangle': lambda i: EquilateralTriangle(i % 100 + 1),
+    'Rectangle': lambda i: Rectangle(i % 100 + 1, i % 7 + 1),
+    'Square': lambda i: Square(i % 100 + 1),
+    'RegularPentagon': lambda i: RegularPentagon(i % 100 + 1),
+    'RegularPolygon': lambda i: RegularPolygon(i % 20 + 3, i % 100 + 1),
+}
+
+
+def make_shapes(size):
+    '''
+    Create size shapes of all kinds, in turn.
+
+    Returns:
+        shapes - list of objects
+    '''
+
+    factories = list(SHAPE_FACTORIES.values())
+    return [factories[i % len(factories)](i) for i in range(size)]
+
+
+def make_shape_list(size):
+    '''
+    Returns:
+        shapes - ShapeList object with size shapes of all kinds
+    '''
+
+    shapes = ShapeList()
+    shapes.add_shapes(make_shapes(size))
+    return shapes
+
+
+def make_table_data(size):
+    '''
+    Returns:
+        (shapes, data) - tuple of ShapeList object and its table rows
+    '''
+
+    shapes = make_shape_list(size)
+    return shapes, shapes.get_data_to_table()
+
+
+def add_all(shapes):
+    '''
+    Add shapes to new ShapeList one by one.
+    '''
+
+    shape_list = ShapeList()
+    for shape in shapes:
+        shape_list.add_shape(shape)
+
+
+def measure(setup, run, repeat):
+    '''
+    Measure the best time of run(setup()) out of repeat runs. Setup is not measured.
+
+    Returns:
+        seconds - float
+    '''
+
+    best = None
+    for i in range(repeat):
+        data = setup()
+        start = time.perf_counter()
+        run(data)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    return best
+
+
+def iter_benchmarks(size):
+    '''
+    Returns:
+        benchmarks - iterator of tuples (name, setup, run)
+    '''
+
+    for kind, factory in SHAPE_FACTORIES.items():
+        yield ('{}.__init__'.format(kind), lambda: None,
+               lambda data, factory=factory: [factory(i) for i in range(size)])
+        yield ('{}.get_area'.format(kind), lambda factory=factory: [factory(i) for i in range(size)],
+               lambda shapes: [shape.get_area() for shape in shapes])
+        yield ('{}.get_perimeter'.format(kind), lambda factory=factory: [factory(i) for i in range(size)],
+               lambda shapes: [shape.get_perimeter() for shape in shapes])
+
+    yield 'ShapeList.add_shape', lambda: make_shapes(size), add_all
+    yield 'ShapeList.get_largest_shape_by_area', lambda: make_shape_list(size), \
+        lambda shapes: shapes.get_largest_shape_by_area()
+    yield 'ShapeList.get_largest_shape_by_perimeter', lambda: make_shape_list(size), \
+        lambda shapes: shapes.get_largest_shape_by_perimeter()
+    yield 'ShapeList.find_largest', lambda: make_shape_list(size), lambda shapes: shapes.find_largest('area')
+    yield 'ShapeList.get_data_to_table', lambda: make_shape_list(size), lambda shapes: shapes.get_data_to_table()
+    yield 'ShapeList.format_table', lambda: make_table_data(size), lambda data: data[0].format_table(data[1])
+
+
+def run_benchmarks(sizes, repeat=3, name_filter=None, output=None):
+    '''
+    Run all benchmarks for every size.
+
+    Args:
+        sizes - list of ints, numbers of shapes
+        repeat - int, number of runs of every benchmark (the best one is kept)
+        name_filter - string, run only benchmarks with this text in name
+        output - file-like object for progress (nothing is written if None)
+
+    Returns:
+        results - dict, "name[size]" -> dict with seconds and nanoseconds per shape
+    '''
+
+    results = {}
+    for size in sizes:
+        for name, setup, run in iter_benchmarks(size):
+            if name_filter and name_filter not in name:
+                continue
+            seconds = measure(setup, run, repeat)
+            key = '{}[{}]'.format(name, size)
+            results[key] = {'seconds': seconds, 'ns_per_shape': seconds / size * 1e9}
+            if output is not None:
+                output.write('{:<50} {:>12.6f} s {:>12.1f} ns/shape\n'.format(key, seconds, seconds / size * 1e9))
+
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    '''
+    Find benchmarks slower than in baseline by more than threshold.
+
+    Args:
+        results - dict returned by run_benchmarks
+        baseline - dict returned by run_benchmarks before
+        threshold - float, allowed slowdown, e.g. 0.1 for 10%
+
+    Returns:
+        regressions - list of tuples (name, baseline seconds, seconds, ratio)
+    '''
+
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before = baseline[name]['seconds']
+        ratio = result['seconds'] / before if before else float('inf')
+        if ratio > 1 + threshold:
+            regressions.append((name, before, result['seconds'], ratio))
+
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of geometry hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000], help='numbers of shapes, e.g. 1000 100000 1000000')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every benchmark, the best one is kept')
+    parser.add_argument('--filter', help='run only benchmarks with this text in name')
+    parser.add_argument('--output', help='save results to JSON file')
+    parser.add_argument('--baseline', help='JSON file with results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown compared to baseline')
+    arguments = parser.parse_args(args)
+
+    results = run_benchmarks(arguments.sizes, arguments.repeat, arguments.filter, sys.stdout)
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, file, indent=2)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            regressions = compare(results, json.load(file)['results'], arguments.threshold)
+        for name, before, seconds, ratio in regressions:
+            print('REGRESSION {}: {:.6f} s -> {:.6f} s ({:+.0%})'.format(name, before, seconds, ratio - 1))
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,448 +1,2127 @@
 from abc import ABC, abstractmethod
+from array import array
+import bisect
+import collections
+import contextlib
+import contextvars
+import functools
+import itertools
 import math
+import operator
+import re
+import sys
+import threading
+from spatial import GridIndex
+
+
+DISPLAY_PRECISION = 2  # number of decimal places shown by __str__ and the shapes table
+FORMULA_CACHE_SIZE = 256  # max number of cached variants of formulas (class, precision, decimal point)
+POLYGON_CACHE_SIZE = 1024  # max number of cached area divisors of regular polygons (one per number of sides)
+MAX_DIMENSION = 1e75  # larger dimensions could overflow the metrics, e.g. s**4 in Heron's formula
+DECIMAL = re.compile(r'[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?')  # number typed by user or read from file, e.g. "2.5" or "1e3"
+trusted = contextvars.ContextVar('trusted', default=False)  # True while checks of dimensions are skipped
+
+
+def format_number(value, precision=None):
+    """
+    Formats number for presentation. Integers are shown as they are, floats are
+    rounded to given number of decimal places.
+
+    Args:
+        value: int or float
+        precision: number of decimal places (DISPLAY_PRECISION by default)
+
+    Returns:
+        str: formatted number
+    """
+
+    if isinstance(value, int):
+        return str(value)
+    if precision is None:
+        precision = DISPLAY_PRECISION
+
+    return '{0:.{1}f}'.format(value, precision)
+
+
+def parse_number(value):
+    """
+    Converts value read from user or file to number.
+
+    Args:
+        value: string or number
+
+    Returns:
+        int or float: the number
+
+    Raises:
+        ValueError: If value is not a number, strings must match DECIMAL.
+    """
+
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError('Parametr must be number!')
+    if isinstance(value, str):
+        value = value.strip()
+        if not DECIMAL.fullmatch(value):
+            raise ValueError('Parametr must be number!')
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+
+    return value
+
+
+@functools.lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def format_formulas(cls, precision, decimal_point):
+    """
+    Formats formulas of shape class, with constants (e.g. pi) rounded to precision
+    and shown with given decimal point. Results are cached, the least recently used
+    variants are evicted.
+
+    Args:
+        cls: Shape class
+        precision: number of decimal places of constants
+        decimal_point: string, e.g. "." or ","
+
+    Returns:
+        tuple: formulas for the area and the perimeter
+    """
+
+    if not cls.formula_constants:
+        return cls.get_area_formula(), cls.get_perimeter_formula()
+    constants = {name: format_number(value, precision).replace('.', decimal_point)
+                 for name, value in cls.formula_constants.items()}
+
+    return cls.area_formula.format(**constants), cls.perimeter_formula.format(**constants)
+
+
+@functools.lru_cache(maxsize=POLYGON_CACHE_SIZE)
+def get_polygon_divisor(n):
+    """
+    Returns divisor of n*a^2 in the area of regular polygon with n sides.
+
+    Args:
+        n: number of sides
+
+    Returns:
+        float: 4*tan(pi/n)
+    """
+
+    return 4*math.tan(math.pi/n)
+
+
+@contextlib.contextmanager
+def trusted_dimensions():
+    """
+    Context manager skipping checks of dimensions in shape constructors,
+    for data which was validated before, e.g. saved shapes or checked columns.
+    """
+
+    token = trusted.set(True)
+    try:
+        yield
+    finally:
+        trusted.reset(token)
+
+
+def segments_intersect(p1, p2, q1, q2):
+    """
+    Checks if segments p1-p2 and q1-q2 have common points.
+
+    Args:
+        p1, p2, q1, q2: points (x, y)
+
+    Returns:
+        bool
+    """
+
+    def orientation(a, b, c):
+        cross = (b[0] - a[0])*(c[1] - a[1]) - (b[1] - a[1])*(c[0] - a[0])
+        return (cross > 0) - (cross < 0)
+
+    def on_segment(a, b, c):
+        return min(a[0], b[0]) <= c[0] <= max(a[0], b[0]) and min(a[1], b[1]) <= c[1] <= max(a[1], b[1])
+
+    o1, o2 = orientation(p1, p2, q1), orientation(p1, p2, q2)
+    o3, o4 = orientation(q1, q2, p1), orientation(q1, q2, p2)
+    if o1 != o2 and o3 != o4:
+        return True
+    return ((o1 == 0 and on_segment(p1, p2, q1)) or (o2 == 0 and on_segment(p1, p2, q2)) or
+            (o3 == 0 and on_segment(q1, q2, p1)) or (o4 == 0 and on_segment(q1, q2, p2)))
+
+
+def get_segment_distance(point, a, b):
+    """
+    Calculates distance from point to segment a-b.
+
+    Args:
+        point, a, b: points (x, y)
+
+    Returns:
+        float: distance
+    """
+
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length = dx*dx + dy*dy
+    t = ((point[0] - a[0])*dx + (point[1] - a[1])*dy) / length if length else 0
+    t = min(max(t, 0), 1)
+    return math.hypot(point[0] - a[0] - t*dx, point[1] - a[1] - t*dy)
+
+
+def iter_edges(vertices):
+    """
+    Returns:
+        iterator: pairs of consecutive vertices, the last one with the first one
+    """
+
+    return zip(vertices, vertices[1:] + vertices[:1])
+
+
+def cached_metric(method):
+    """
+    Decorator caching value returned by shape's metric method (get_area, get_perimeter)
+    in the instance's slot (_area, _perimeter). Shapes are immutable, so cached value never gets stale.
+
+    Args:
+        method: metric method to decorate
+
+    Returns:
+        function: decorated method
+    """
+
+    slot = '_' + method.__name__[len('get_'):]
+
+    @functools.wraps(method)
+    def wrapper(self):
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            value = method(self)
+            object.__setattr__(self, slot, value)
+            return value
+
+    return wrapper
+
+
+def cached_placement(method):
+    """
+    Decorator caching value returned by placed shape's method (get_bounds, get_vertices)
+    in the shape's Placement object, so shapes which are not placed need no slots for it.
+
+    Args:
+        method: method to decorate
+
+    Returns:
+        function: decorated method
+
+    Raises:
+        ValueError: If the shape is not placed.
+    """
+
+    name = method.__name__[len('get_'):]
+
+    @functools.wraps(method)
+    def wrapper(self):
+        placement = getattr(self, '_placement', None)
+        if placement is None:
+            raise ValueError('Shape is not placed!')
+        value = getattr(placement, name)
+        if value is None:
+            value = method(self)
+            setattr(placement, name, value)
+        return value
+
+    return wrapper
+
+
+class Placement:
+    """
+    This is a class representing position of placed shape on the plane,
+    together with the shape's bounds and vertices calculated from it.
+    """
+
+    __slots__ = ('x', 'y', 'rotation', 'bounds', 'vertices')
+
+    def __init__(self, x, y, rotation):
+        """
+        Constructs Placement object
+
+        Args:
+            x, y: coordinates of the center of the shape
+            rotation: angle in radians
+        """
+
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.bounds = None  # cache, see cached_placement
+        self.vertices = None
+
+
+class ShapeKind:
+    """
+    This is a class representing registered kind of shape: its class, entry in the menu
+    and questions asked for its dimensions.
+    """
+
+    def __init__(self, cls, key, label, prompts):
+        """
+        Constructs ShapeKind object
+
+        Args:
+            cls: Shape class
+            key: string, number of the kind in the menu
+            label: string, name of the kind shown in the menu
+            prompts: tuple of strings, one question per dimension
+        """
+
+        self.cls = cls
+        self.key = key
+        self.label = label
+        self.prompts = prompts
+
+    @property
+    def name(self):
+        return self.cls.__name__
+
+    def get_formulas(self):
+        """
+        Returns:
+            tuple: formulas for the area and the perimeter
+        """
+
+        return self.cls.get_formulas()
+
+
+SHAPE_KINDS = {}  # name of class -> ShapeKind, in order of registration
+MENU_KINDS = {}  # key in the menu -> ShapeKind
+SHAPE_CLASSES = {}  # name of class -> Shape class
+
+
+def register_shape(key, label, *prompts):
+    """
+    Class decorator adding shape class to the registry, so it can be created
+    from the menu, loaded from files and used by the batch commands.
+
+    Args:
+        key: string, number of the kind in the menu
+        label: string, name of the kind shown in the menu
+        prompts: questions asked for dimensions, in order of cls.dimensions
+
+    Returns:
+        function: decorator
+    """
+
+    def decorator(cls):
+        if len(prompts) != len(cls.dimensions):
+            raise ValueError('{} needs {} prompts!'.format(cls.__name__, len(cls.dimensions)))
+        if key in MENU_KINDS:
+            raise ValueError('Key {} is already used by {}!'.format(key, MENU_KINDS[key].name))
+        kind = ShapeKind(cls, key, label, prompts)
+        SHAPE_KINDS[cls.__name__] = MENU_KINDS[key] = kind
+        SHAPE_CLASSES[cls.__name__] = cls
+        return cls
+
+    return decorator
 
 
 class Shape(ABC):
     """
     This is a abstract class representing geometrical shape.
+    Shapes are immutable values: they are compared and hashed by class, dimensions and placement.
+    Shapes are not placed on the plane, unless created by place().
     """
 
-    def __init__(self, *args):
+    __slots__ = ('_area', '_perimeter', '_placement')  # cache of calculated metrics, see cached_metric, and Placement
+    formula_constants = {}  # name -> value of constant shown in area_formula and perimeter_formula
+    dimensions = ()  # names of the attributes describing shape's size
+
+    def __init__(self, *args):
+        """
+        Constructs Shape object
+
+        Raises:
+            ValueError: If any of the parameters is below 0, NaN or infinite.
+        """
+        if not trusted.get():
+            self.check_dimensions(*args)
+
+    @staticmethod
+    def check_dimensions(*args):
+        """
+        Checks values of shape's dimensions.
+
+        Raises:
+            ValueError: If any of the parameters is below 0, NaN, infinite or above MAX_DIMENSION.
+        """
+        for arg in args:
+            if not 0 <= arg <= MAX_DIMENSION:
+                if arg < 0:
+                    raise ValueError('Number below 0!!')
+                raise ValueError('Number is too large!' if arg < math.inf else 'Number must be finite!')
+
+    @classmethod
+    def check_columns(cls, *columns):
+        """
+        Checks dimensions of many shapes at once, with the same rules as the constructor.
+        Columns are summed and searched for minimum and maximum by builtins, values are
+        checked one by one only to find the wrong one.
+
+        Args:
+            columns: sequences of numbers, one per dimension
+
+        Raises:
+            ValueError: If any of the values is below 0, NaN, infinite or above MAX_DIMENSION.
+        """
+        for column in columns:
+            if not column:
+                continue
+            total = sum(column)  # NaN if there is NaN in the column
+            if total != total or not 0 <= min(column) or not max(column) <= MAX_DIMENSION:
+                Shape.check_dimensions(*column)
+
+    def __setattr__(self, name, value):
+        """
+        Shapes are immutable, constructors set their slots with object.__setattr__.
+
+        Raises:
+            AttributeError: Always.
+        """
+
+        raise AttributeError('Shape is immutable, can not change {}!'.format(name))
+
+    def __delattr__(self, name):
+        raise AttributeError('Shape is immutable, can not delete {}!'.format(name))
+
+    def get_dimensions(self):
+        """
+        Returns values of shape's dimensions.
+
+        Returns:
+            tuple: values of attributes listed in dimensions
+        """
+
+        return tuple(getattr(self, name) for name in self.dimensions)
+
+    def get_arguments(self):
+        """
+        Returns arguments of the constructor creating the same shape, not placed.
+
+        Returns:
+            tuple: values of dimensions by default
+        """
+
+        return self.get_dimensions()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.get_dimensions() == other.get_dimensions() and self.get_placement() == other.get_placement()
+
+    def __hash__(self):
+        return hash((type(self), self.get_dimensions(), self.get_placement()))
+
+    def __repr__(self):
+        text = '{}({})'.format(self.__class__.__name__, ', '.join(map(repr, self.get_dimensions())))
+        placement = self.get_placement()
+        if placement is not None:
+            text += '.place({}, {}, {})'.format(*map(repr, placement))
+        return text
+
+    def __reduce__(self):
+        """
+        Pickles shape as call of its constructor (and place), like its repr.
+        Slots can not be restored one by one, because shapes are immutable.
+        """
+
+        placement = self.get_placement()
+        if placement is None:
+            return type(self), self.get_arguments()
+        with trusted_dimensions():
+            shape = type(self)(*self.get_arguments())
+        return shape.place, placement
+
+    def place(self, x, y, rotation=0):
+        """
+        Creates copy of the shape placed on the plane.
+
+        Args:
+            x, y: coordinates of the center of the shape (centroid of polygons)
+            rotation: angle in radians, counterclockwise around the center
+
+        Returns:
+            Shape: placed shape of the same class and dimensions
+
+        Raises:
+            ValueError: If any of the coordinates is NaN or infinite.
+        """
+
+        if not all(map(math.isfinite, (x, y, rotation))):
+            raise ValueError('Placement must be finite!')
+        with trusted_dimensions():
+            shape = type(self)(*self.get_arguments())
+        object.__setattr__(shape, '_placement', Placement(x, y, rotation))
+        return shape
+
+    def get_placement(self):
+        """
+        Returns:
+            tuple: (x, y, rotation), None if the shape is not placed
+        """
+
+        placement = getattr(self, '_placement', None)
+        if placement is None:
+            return None
+        return placement.x, placement.y, placement.rotation
+
+    def check_placement(self):
+        """
+        Returns:
+            tuple: (x, y, rotation)
+
+        Raises:
+            ValueError: If the shape is not placed.
+        """
+
+        placement = self.get_placement()
+        if placement is None:
+            raise ValueError('Shape is not placed!')
+        return placement
+
+    def get_local_vertices(self):
+        """
+        Returns vertices of the shape centered at (0, 0), not rotated.
+
+        Returns:
+            list: tuples (x, y), counterclockwise
+        """
+
+        raise NotImplementedError('{} has no vertices'.format(self.__class__.__name__))
+
+    @cached_placement
+    def get_vertices(self):
+        """
+        Returns vertices of the placed shape.
+
+        Returns:
+            tuple: tuples (x, y), counterclockwise
+        """
+
+        x, y, rotation = self.check_placement()
+        cos, sin = math.cos(rotation), math.sin(rotation)
+        return tuple((x + vx*cos - vy*sin, y + vx*sin + vy*cos) for vx, vy in self.get_local_vertices())
+
+    @cached_placement
+    def get_bounds(self):
+        """
+        Returns bounding box of the placed shape.
+
+        Returns:
+            tuple: (xmin, ymin, xmax, ymax)
+        """
+
+        xs, ys = zip(*self.get_vertices())
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def contains_point(self, x, y):
+        """
+        Checks if point lies inside the placed shape or on its border.
+
+        Returns:
+            bool
+        """
+
+        vertices = self.get_vertices()
+        for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1]):
+            if (x2 - x1)*(y - y1) - (y2 - y1)*(x - x1) < 0:
+                return False
+        return True
+
+    def get_axes(self, other):
+        """
+        Returns axes on which projections of this shape and other shape may not overlap
+        (normals of the edges of polygon).
+
+        Returns:
+            list: tuples (x, y)
+        """
+
+        vertices = self.get_vertices()
+        return [(y1 - y2, x2 - x1) for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1])]
+
+    def project(self, nx, ny):
+        """
+        Projects the placed shape on axis.
+
+        Returns:
+            tuple: (min, max) of dot products with (nx, ny)
+        """
+
+        products = [vx*nx + vy*ny for vx, vy in self.get_vertices()]
+        return min(products), max(products)
+
+    def is_convex(self):
+        """
+        Returns:
+            bool: True, shapes with fixed dimensions are convex
+        """
+
+        return True
+
+    def overlaps(self, other):
+        """
+        Checks if two placed shapes have common points (touching shapes overlap).
+        Convex shapes do not overlap only if there is an axis on which their projections
+        are separated, other shapes are checked by overlaps_outline.
+
+        Args:
+            other: placed shape
+
+        Returns:
+            bool
+        """
+
+        if not (self.is_convex() and other.is_convex()):
+            return self.overlaps_outline(other)
+        for axis in itertools.chain(self.get_axes(other), other.get_axes(self)):
+            low, high = self.project(*axis)
+            other_low, other_high = other.project(*axis)
+            if high < other_low or other_high < low:
+                return False
+        return True
+
+    def overlaps_outline(self, other):
+        """
+        Checks if two placed shapes (also concave polygons) have common points:
+        their borders cross, or one of them lies inside the other.
+
+        Args:
+            other: placed shape
+
+        Returns:
+            bool
+        """
+
+        if isinstance(other, Circle):
+            return other.overlaps_outline(self)
+        vertices, other_vertices = self.get_vertices(), other.get_vertices()
+        if self.contains_point(*other_vertices[0]) or other.contains_point(*vertices[0]):
+            return True
+        other_edges = list(iter_edges(other_vertices))
+        for p1, p2 in iter_edges(vertices):
+            xmin, xmax = min(p1[0], p2[0]), max(p1[0], p2[0])
+            ymin, ymax = min(p1[1], p2[1]), max(p1[1], p2[1])
+            for q1, q2 in other_edges:
+                if max(q1[0], q2[0]) < xmin or min(q1[0], q2[0]) > xmax or \
+                        max(q1[1], q2[1]) < ymin or min(q1[1], q2[1]) > ymax:
+                    continue
+                if segments_intersect(p1, p2, q1, q2):
+                    return True
+        return False
+
+    @abstractmethod
+    def get_area(self):
+        """
+        Calculates shape's area.
+
+        Returns:
+            float: area of the shape
+        """
+        return self.area
+
+    @abstractmethod
+    def get_perimeter(self):
+        """
+        Calculates shape's perimeter.
+
+        Returns:
+            float: perimeter of the shape
+        """
+        return self.perimeter
+
+    def get_rounded_area(self, ndigits=2):
+        """
+        Calculates shape's area rounded to given number of decimal places.
+
+        Returns:
+            float: rounded area of the shape
+        """
+
+        return round(self.get_area(), ndigits)
+
+    def get_rounded_perimeter(self, ndigits=2):
+        """
+        Calculates shape's perimeter rounded to given number of decimal places.
+
+        Returns:
+            float: rounded perimeter of the shape
+        """
+
+        return round(self.get_perimeter(), ndigits)
+
+    @abstractmethod
+    def __str__(self):
+        """
+        Returns information about the shape as string.
+
+        Returns:
+            str: information about shape
+        """
+        return self.text
+
+    @classmethod
+    def areas(cls, *columns):
+        """
+        Calculates areas of many shapes at once.
+        Generic version creates every shape, subclasses override it with a formula working on whole columns.
+
+        Args:
+            columns: one sequence of values per dimension of the shape
+
+        Returns:
+            array: areas of the shapes
+        """
+
+        return array('d', [cls(*dimensions).get_area() for dimensions in zip(*columns)])
+
+    @classmethod
+    def perimeters(cls, *columns):
+        """
+        Calculates perimeters of many shapes at once.
+        Generic version creates every shape, subclasses override it with a formula working on whole columns.
+
+        Args:
+            columns: one sequence of values per dimension of the shape
+
+        Returns:
+            array: perimeters of the shapes
+        """
+
+        return array('d', [cls(*dimensions).get_perimeter() for dimensions in zip(*columns)])
+
+    @classmethod
+    def get_area_formula(cls):
+        """
+        Returns formula for the area of the shape as a string.
+
+        Returns:
+            str: area formula
+        """
+        return self.area_formula
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        """
+        Returns formula for the perimeter of the shape as a string.
+
+        Returns:
+            str: perimeter formula
+        """
+        return self.perimeter_formula
+
+    @classmethod
+    def get_formulas(cls, precision=None, decimal_point='.'):
+        """
+        Returns formulas for the area and the perimeter, cached by format_formulas.
+
+        Args:
+            precision: number of decimal places of constants (DISPLAY_PRECISION by default)
+            decimal_point: string, e.g. "," for locales with decimal comma
+
+        Returns:
+            tuple: formulas for the area and the perimeter
+        """
+
+        return format_formulas(cls, DISPLAY_PRECISION if precision is None else precision, decimal_point)
+
+
+@register_shape('1', 'Circle', 'Write radius r: ')
+class Circle(Shape):
+    '''This is class representing geometric figure: circle'''
+
+    __slots__ = ('r',)
+    dimensions = ('r',)
+    formula_constants = {'pi': math.pi}
+    area_formula = '{pi}x r^2'
+    perimeter_formula = '2 x {pi} x r'
+
+    def __init__(self, r):
+        '''
+        Constructs Circle object
+        '''
+
+        if not trusted.get():
+            self.check_dimensions(r)
+        object.__setattr__(self, 'r', r)
+
+    @cached_placement
+    def get_bounds(self):
+        """
+        Returns bounding box of the placed circle.
+
+        Returns:
+            tuple: (xmin, ymin, xmax, ymax)
+        """
+
+        x, y, rotation = self.check_placement()
+        return x - self.r, y - self.r, x + self.r, y + self.r
+
+    def contains_point(self, x, y):
+        """
+        Checks if point lies inside the placed circle or on its border.
+
+        Returns:
+            bool
+        """
+
+        cx, cy, rotation = self.check_placement()
+        return (x - cx)**2 + (y - cy)**2 <= self.r**2
+
+    def get_axes(self, other):
+        """
+        Returns axis from the center of the circle to the nearest vertex
+        (or the center) of other shape.
+
+        Returns:
+            list: tuples (x, y)
+        """
+
+        x, y, rotation = self.check_placement()
+        if isinstance(other, Circle):
+            points = [other.check_placement()[:2]]
+        else:
+            points = other.get_vertices()
+        px, py = min(points, key=lambda point: (point[0] - x)**2 + (point[1] - y)**2)
+        return [(px - x, py - y)]
+
+    def project(self, nx, ny):
+        """
+        Projects the placed circle on axis.
+
+        Returns:
+            tuple: (min, max) of dot products with (nx, ny)
+        """
+
+        x, y, rotation = self.check_placement()
+        center = x*nx + y*ny
+        radius = self.r * math.hypot(nx, ny)
+        return center - radius, center + radius
+
+    def overlaps_outline(self, other):
+        """
+        Checks if the placed circle and other placed shape (e.g. concave polygon) have common points:
+        center of the circle lies inside the shape, or border of the shape is close to the center.
+
+        Args:
+            other: placed shape
+
+        Returns:
+            bool
+        """
+
+        x, y, rotation = self.check_placement()
+        if isinstance(other, Circle):
+            ox, oy, other_rotation = other.check_placement()
+            return math.hypot(x - ox, y - oy) <= self.r + other.r
+        if other.contains_point(x, y):
+            return True
+        return any(get_segment_distance((x, y), a, b) <= self.r for a, b in iter_edges(other.get_vertices()))
+
+    @cached_metric
+    def get_area(self):
+        """
+        Calculates circle area.
+
+        Returns:
+            float: area of the circle
+        """
+
+        return math.pi * self.r * self.r
+
+    @cached_metric
+    def get_perimeter(self):
+        """
+        Calculates circle perimeter.
+
+        Returns:
+            float: perimeter of the circle
+        """
+
+        return 2 * math.pi * self.r
+
+    @classmethod
+    def areas(cls, r):
+        """
+        Calculates areas of many circles at once, without creating circle objects.
+
+        Args:
+            r: sequence of radii
+
+        Returns:
+            array: areas of the circles
+        """
+
+        return array('d', [math.pi * x * x for x in r])
+
+    @classmethod
+    def perimeters(cls, r):
+        """
+        Calculates perimeters of many circles at once, without creating circle objects.
+
+        Args:
+            r: sequence of radii
+
+        Returns:
+            array: perimeters of the circles
+        """
+
+        return array('d', [2 * math.pi * x for x in r])
+
+    @classmethod
+    def get_area_formula(cls):
+        """
+        Returns formula for the area of the circle as a string.
+
+        Returns:
+            str: area formula
+        """
+
+        return cls.get_formulas()[0]
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        """
+        Returns formula for the perimeter of the circle as a string.
+
+        Returns:
+            str: perimeter formula
+        """
+
+        return cls.get_formulas()[1]
+
+    def __str__(self):
+        """
+        Returns information about the circle as string.
+
+        Returns:
+            str: information about circle
+        """
+
+        return '{}, r = {}'.format(self.__class__.__name__, format_number(self.r))
+
+
+@register_shape('2', 'Triangle', 'Write length side a: ', 'Write length side b: ', 'Write length side c: ')
+class Triangle(Shape):
+    '''
+    This is class representing geometric figure: triangle.
+    To inherit from Shape.
+    '''
+
+    __slots__ = ('a', 'b', 'c')
+    dimensions = ('a', 'b', 'c')
+
+    def __init__(self, a, b, c):
+        '''
+        Constructs Triangle object
+        '''
+
+        if not trusted.get():
+            self.check_dimensions(a, b, c)
+        object.__setattr__(self, 'a', a)
+        object.__setattr__(self, 'b', b)
+        object.__setattr__(self, 'c', c)
+
+    def get_local_vertices(self):
+        """
+        Returns vertices of the triangle centered at its centroid, with side c on x axis.
+
+        Returns:
+            list: tuples (x, y), counterclockwise
+        """
+
+        px = (self.b**2 + self.c**2 - self.a**2) / (2*self.c) if self.c else 0
+        py = math.sqrt(max(self.b**2 - px**2, 0))
+        cx, cy = (self.c + px) / 3, py / 3
+        return [(-cx, -cy), (self.c - cx, -cy), (px - cx, py - cy)]
+
+    @staticmethod
+    def check_dimensions(a, b, c):
+        """
+        Checks sides of the triangle.
+
+        Raises:
+            ValueError: If any of the sides is below 0, NaN or infinite,
+                or sides do not satisfy triangle inequality.
+        """
+        Shape.check_dimensions(a, b, c)
+        if a + b < c or a + c < b or b + c < a:
+            raise ValueError('Sides do not make a triangle!')
+
+    @classmethod
+    def check_columns(cls, a, b, c):
+        """
+        Checks sides of many triangles at once.
+
+        Raises:
+            ValueError: If any of the sides is below 0, NaN or infinite,
+                or sides do not satisfy triangle inequality.
+        """
+        super().check_columns(a, b, c)
+        for x, y, z in zip(a, b, c):
+            if x + y < z or x + z < y or y + z < x:
+                raise ValueError('Sides do not make a triangle!')
+
+    @cached_metric
+    def get_area(self):
+        """
+        Calculates triangle area.
+
+        Returns:
+            float: area of the triangle
+        """
+
+        s = (self.a + self.b + self.c) / 2
+        return math.sqrt(max(s*(s - self.a)*(s - self.b)*(s - self.c), 0))  # rounding of degenerate triangle
+
+    @cached_metric
+    def get_perimeter(self):
+        """
+        Calculates triangle perimeter.
+
+        Returns:
+            float: perimeter of the triangle
+        """
+
+        return self.a + self.b + self.c
+
+    @classmethod
+    def areas(cls, a, b, c):
+        """
+        Calculates areas of many triangles at once, without creating triangle objects.
+
+        Args:
+            a, b, c: sequences of side lengths
+
+        Returns:
+            array: areas of the triangles
+        """
+
+        areas = array('d')
+        for x, y, z in zip(a, b, c):
+            s = (x + y + z) / 2
+            areas.append(math.sqrt(max(s*(s - x)*(s - y)*(s - z), 0)))
+        return areas
+
+    @classmethod
+    def perimeters(cls, a, b, c):
+        """
+        Calculates perimeters of many triangles at once, without creating triangle objects.
+
+        Args:
+            a, b, c: sequences of side lengths
+
+        Returns:
+            array: perimeters of the triangles
+        """
+
+        return array('d', [x + y + z for x, y, z in zip(a, b, c)])
+
+    @classmethod
+    def get_area_formula(cls):
+        """
+        Returns formula for the area of the triangle as a string.
+
+        Returns:
+            str: area formula
+        """
+
+        return 'sqrt(s x (s-a)x(s-b)x(s-c)) \ns = (a+b+c)/2'
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        """
+        Returns formula for the perimeter of the triangle as a string.
+
+        Returns:
+            str: perimeter formula
+        """
+
+        return 'a + b + c'
+
+    def __str__(self):
+        """
+        Returns information about the triangle as string.
+
+        Returns:
+            str: information about triangle
+        """
+
+        return '{}, a = {}, b = {}, c = {}'.format(self.__class__.__name__, format_number(self.a),
+                                                   format_number(self.b), format_number(self.c))
+
+
+@register_shape('3', 'Equalateral Triangle', 'Write length side a: ')
+class EquilateralTriangle(Triangle):
+    '''This is class representing geometric figure: equilateral triangle
+    To inherit from Triangle.'''
+
+    __slots__ = ()
+    dimensions = ('a',)
+
+    def __init__(self, a):
+        '''
+        Constructs EquilateralTriangle object
+        '''
+
+        super().__init__(a, a, a)
+
+    @staticmethod
+    def check_dimensions(*args):
+        """
+        Checks side of the equilateral triangle, equal sides always make a triangle.
+
+        Raises:
+            ValueError: If the side is below 0, NaN or infinite.
+        """
+        Shape.check_dimensions(*args)
+
+    @classmethod
+    def check_columns(cls, *columns):
+        """
+        Checks sides of many equilateral triangles at once.
+
+        Raises:
+            ValueError: If any of the sides is below 0, NaN or infinite.
+        """
+        Shape.check_columns(*columns)
+
+    @classmethod
+    def areas(cls, a):
+        """
+        Calculates areas of many equilateral triangles at once, without creating equilateral triangle objects.
+
+        Args:
+            a: sequence of side lengths
+
+        Returns:
+            array: areas of the equilateral triangles
+        """
+
+        return Triangle.areas(a, a, a)
+
+    @classmethod
+    def perimeters(cls, a):
+        """
+        Calculates perimeters of many equilateral triangles at once, without creating equilateral triangle objects.
+
+        Args:
+            a: sequence of side lengths
+
+        Returns:
+            array: perimeters of the equilateral triangles
+        """
+
+        return array('d', [3 * x for x in a])
+
+    @classmethod
+    def get_area_formula(cls):
+        """
+        Returns formula for the area of the equilateral triangle as a string.
+
+        Returns:
+            str: area formula
+        """
+
+        return '(a^2 * sqrt(3)) / 4'
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        """
+        Returns formula for the perimeter of the equilateral triangle as a string.
+
+        Returns:
+            str: perimeter formula
+        """
+
+        return '3*a'
+
+    def __str__(self):
         """
-        Constructs Shape object
+        Returns information about the equilateral triangle as string.
 
-        Raises:
-            ValueError: If any of the parameters is below 0.
+        Returns:
+            str: information about equilateral triangle
         """
-        for arg in args:
-            if arg < 0:
-                raise ValueError('Number below 0!!')
 
-    @abstractmethod
+        return '{}, a = {}'.format(self.__class__.__name__, format_number(self.a))
+
+
+@register_shape('4', 'Rectangle', 'Write length side a: ', 'Write length side b: ')
+class Rectangle(Shape):
+    '''This is class representing geometric figure: rectangle
+    To inherit from Shape.'''
+
+    __slots__ = ('a', 'b')
+    dimensions = ('a', 'b')
+
+    def __init__(self, a, b):
+        '''
+        Constructs Rectangle object
+        '''
+
+        if not trusted.get():
+            self.check_dimensions(a, b)
+        object.__setattr__(self, 'a', a)
+        object.__setattr__(self, 'b', b)
+
+    def get_local_vertices(self):
+        """
+        Returns vertices of the rectangle centered at (0, 0), with side a on x axis.
+
+        Returns:
+            list: tuples (x, y), counterclockwise
+        """
+
+        x, y = self.a / 2, self.b / 2
+        return [(-x, -y), (x, -y), (x, y), (-x, y)]
+
+    @cached_metric
     def get_area(self):
         """
-        Calculates shape's area.
+        Calculates rectangle area.
 
         Returns:
-            float: area of the shape
+            float: area of the rectangle
         """
-        return self.area
 
-    @abstractmethod
+        return self.a * self.b
+
+    @cached_metric
     def get_perimeter(self):
         """
-        Calculates shape's perimeter.
+        Calculates rectangle perimeter.
 
         Returns:
-            float: perimeter of the shape
+            float: perimeter of the rectangle
         """
-        return self.perimeter
 
-    @abstractmethod
+        return 2*self.a + 2*self.b
+
+    @classmethod
+    def areas(cls, a, b):
+        """
+        Calculates areas of many rectangles at once, without creating rectangle objects.
+
+        Args:
+            a, b: sequences of side lengths
+
+        Returns:
+            array: areas of the rectangles
+        """
+
+        return array('d', [x * y for x, y in zip(a, b)])
+
+    @classmethod
+    def perimeters(cls, a, b):
+        """
+        Calculates perimeters of many rectangles at once, without creating rectangle objects.
+
+        Args:
+            a, b: sequences of side lengths
+
+        Returns:
+            array: perimeters of the rectangles
+        """
+
+        return array('d', [2*x + 2*y for x, y in zip(a, b)])
+
+    @classmethod
+    def get_area_formula(cls):
+        """
+        Returns formula for the area of the rectangle as a string.
+
+        Returns:
+            str: area formula
+        """
+
+        return 'a*b'
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        """
+        Returns formula for the perimeter of the rectangle as a string.
+
+        Returns:
+            str: perimeter formula
+        """
+
+        return '2a + 2b'
+
     def __str__(self):
         """
-        Returns information about the shape as string.
+        Returns information about the rectangle as string.
 
         Returns:
-            str: information about shape
+            str: information about rectangle
         """
-        return self.text
+
+        return '{}, a = {}, b = {}'.format(self.__class__.__name__, format_number(self.a), format_number(self.b))
+
+
+@register_shape('5', 'Square', 'Write length side a: ')
+class Square(Rectangle):
+    '''This is class representing geometric figure: square
+    To inherit from Rectangle.'''
+
+    __slots__ = ()
+    dimensions = ('a',)
+
+    def __init__(self, a):
+        '''
+        Constructs Square object
+        '''
+
+        super().__init__(a, a)
+
+    @classmethod
+    def areas(cls, a):
+        """
+        Calculates areas of many squares at once, without creating square objects.
+
+        Args:
+            a: sequence of side lengths
+
+        Returns:
+            array: areas of the squares
+        """
+
+        return array('d', [x * x for x in a])
+
+    @classmethod
+    def perimeters(cls, a):
+        """
+        Calculates perimeters of many squares at once, without creating square objects.
+
+        Args:
+            a: sequence of side lengths
+
+        Returns:
+            array: perimeters of the squares
+        """
+
+        return array('d', [4 * x for x in a])
 
     @classmethod
     def get_area_formula(cls):
         """
-        Returns formula for the area of the shape as a string.
+        Returns formula for the area of the square as a string.
 
         Returns:
             str: area formula
         """
-        return self.area_formula
+
+        return 'a^2'
 
     @classmethod
     def get_perimeter_formula(cls):
         """
-        Returns formula for the perimeter of the shape as a string.
+        Returns formula for the perimeter of the square as a string.
 
         Returns:
             str: perimeter formula
         """
-        return self.perimeter_formula
 
+        return '2*a'
 
-class Circle(Shape):
-    '''This is class representing geometric figure: circle'''
+    def __str__(self):
+        """
+        Returns information about the square as string.
 
-    def __init__(self, r):
+        Returns:
+            str: information about square
+        """
+
+        return '{}, a = {}'.format(self.__class__.__name__, format_number(self.a))
+
+
+@register_shape('7', 'Regular polygon', 'Write number of sides n: ', 'Write length side a: ')
+class RegularPolygon(Shape):
+    '''This is class representing geometric figure: regular polygon with n sides
+    To inherit from Shape.'''
+
+    __slots__ = ('n', 'a')
+    dimensions = ('n', 'a')
+
+    def __init__(self, n, a):
         '''
-        Constructs Circle object
+        Constructs RegularPolygon object
         '''
 
-        super().__init__(r)
-        self.r = r
+        if not trusted.get():
+            self.check_dimensions(n, a)
+        object.__setattr__(self, 'n', n)
+        object.__setattr__(self, 'a', a)
+
+    @staticmethod
+    def check_dimensions(n, a):
+        """
+        Checks number of sides and side length of the polygon.
+
+        Raises:
+            ValueError: If any of the parameters is below 0, NaN or infinite,
+                or n is not integer of at least 3.
+        """
+        Shape.check_dimensions(n, a)
+        if n < 3 or n != int(n):
+            raise ValueError('Number of sides must be integer of at least 3!')
+
+    @classmethod
+    def check_columns(cls, n, a):
+        """
+        Checks dimensions of many regular polygons at once.
+
+        Raises:
+            ValueError: If any of the parameters is below 0, NaN or infinite,
+                or any n is not integer of at least 3.
+        """
+        super().check_columns(n, a)
+        if n and (min(n) < 3 or any(k != int(k) for k in n)):
+            raise ValueError('Number of sides must be integer of at least 3!')
+
+    def get_local_vertices(self):
+        """
+        Returns vertices of the polygon centered at (0, 0), with the first vertex on y axis.
+
+        Returns:
+            list: tuples (x, y), counterclockwise
+        """
+
+        n = int(self.n)
+        radius = self.a / (2*math.sin(math.pi/n))
+        angles = [math.pi/2 + 2*math.pi*k/n for k in range(n)]
+        return [(radius*math.cos(angle), radius*math.sin(angle)) for angle in angles]
 
+    @cached_metric
     def get_area(self):
         """
-        Calculates circle area.
+        Calculates regular polygon area.
 
         Returns:
-            float: area of the circle
+            float: area of the regular polygon
         """
 
-        self.area = float("{0:.2f}".format(math.pi * self.r * self.r))
-        return self.area
+        return self.n * self.a**2 / get_polygon_divisor(self.n)
+
+    @cached_metric
+    def get_perimeter(self):
+        """
+        Calculates regular polygon perimeter.
+
+        Returns:
+            float: perimeter of the regular polygon
+        """
+
+        return self.n*self.a
+
+    @classmethod
+    def areas(cls, n, a):
+        """
+        Calculates areas of many regular polygons at once, without creating regular polygon objects.
+
+        Args:
+            n: sequence of numbers of sides
+            a: sequence of side lengths
+
+        Returns:
+            array: areas of the regular polygons
+        """
+
+        return array('d', [k * x**2 / get_polygon_divisor(k) for k, x in zip(n, a)])
+
+    @classmethod
+    def perimeters(cls, n, a):
+        """
+        Calculates perimeters of many regular polygons at once, without creating regular polygon objects.
+
+        Args:
+            n: sequence of numbers of sides
+            a: sequence of side lengths
+
+        Returns:
+            array: perimeters of the regular polygons
+        """
+
+        return array('d', map(operator.mul, n, a))
 
+    @classmethod
+    def get_area_formula(cls):
+        """
+        Returns formula for the area of the regular polygon as a string.
+
+        Returns:
+            str: area formula
+        """
+
+        return 'n*a^2 / (4*tan(pi/n))'
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        """
+        Returns formula for the perimeter of the regular polygon as a string.
+
+        Returns:
+            str: perimeter formula
+        """
+
+        return 'n*a'
+
+    def __str__(self):
+        """
+        Returns information about the regular polygon as string.
+
+        Returns:
+            str: information about regular polygon
+        """
+
+        return '{}, n = {}, a = {}'.format(self.__class__.__name__, format_number(self.n), format_number(self.a))
+
+
+@register_shape('6', 'Regular pentagon', 'Write length side a: ')
+class RegularPentagon(Shape):
+    '''This is class representing geometric figure: regular pentagon
+    To inherit from Shape. Number of sides is a class constant, so pentagons
+    do not keep it in their slots, as RegularPolygon does.'''
+
+    __slots__ = ('a',)
+    dimensions = ('a',)
+    n = 5
+    area_factor = math.sqrt(5*(5 + 2*math.sqrt(5)))
+
+    def __init__(self, a):
+        '''
+        Constructs RegularPentagon object
+        '''
+
+        if not trusted.get():
+            self.check_dimensions(a)
+        object.__setattr__(self, 'a', a)
+
+    get_local_vertices = RegularPolygon.get_local_vertices
+
+    @cached_metric
+    def get_area(self):
+        """
+        Calculates regular pentagon area.
+
+        Returns:
+            float: area of the regular pentagon
+        """
+
+        return (self.a**2 * self.area_factor)/4
+
+    @cached_metric
     def get_perimeter(self):
         """
-        Calculates circle perimeter.
+        Calculates regular pentagon perimeter.
+
+        Returns:
+            float: perimeter of the regular pentagon
+        """
+
+        return 5*self.a
+
+    @classmethod
+    def areas(cls, a):
+        """
+        Calculates areas of many regular pentagons at once, without creating regular pentagon objects.
+
+        Args:
+            a: sequence of side lengths
+
+        Returns:
+            array: areas of the regular pentagons
+        """
+
+        factor = cls.area_factor
+        return array('d', [(x**2 * factor)/4 for x in a])
+
+    @classmethod
+    def perimeters(cls, a):
+        """
+        Calculates perimeters of many regular pentagons at once, without creating regular pentagon objects.
+
+        Args:
+            a: sequence of side lengths
 
         Returns:
-            float: perimeter of the circle
+            array: perimeters of the regular pentagons
         """
 
-        self.perimeter = float("{0:.2f}".format(2 * math.pi * self.r))
-        return self.perimeter
+        return array('d', [5 * x for x in a])
 
     @classmethod
     def get_area_formula(cls):
         """
-        Returns formula for the area of the circle as a string.
+        Returns formula for the area of the regular pentagon as a string.
 
         Returns:
             str: area formula
         """
 
-        return '{0:.2f}x r^2'.format(math.pi)
+        return '(a^2 * sqrt(5(5 + 2*sqrt(5)))) / 4'
 
     @classmethod
     def get_perimeter_formula(cls):
         """
-        Returns formula for the perimeter of the circle as a string.
+        Returns formula for the perimeter of the regular pentagon as a string.
 
         Returns:
             str: perimeter formula
         """
 
-        return '2 x {0:.2f} x r'.format(math.pi)
+        return '5*a'
 
     def __str__(self):
         """
-        Returns information about the circle as string.
+        Returns information about the regular pentagon as string.
 
         Returns:
-            str: information about circle
+            str: information about regular pentagon
         """
 
-        self.text = '{}, r = {}'.format(self.__class__.__name__, self.r)
-        return self.text
+        return '{}, a = {}'.format(self.__class__.__name__, format_number(self.a))
 
 
-class Triangle(Shape):
-    '''
-    This is class representing geometric figure: triangle.
-    To inherit from Shape.
-    '''
+class Polygon(Shape):
+    '''This is class representing geometric figure: polygon given by its vertices
+    To inherit from Shape. Vertices are kept in one array of floats x0, y0, x1, y1, ...,
+    so area and perimeter are calculated by builtins, without Python loop over vertices.'''
 
-    def __init__(self, a, b, c):
+    __slots__ = ('vertices', 'convex')  # convex is found on the first call of is_convex
+    dimensions = ()  # number of vertices differs, so polygons are not kept in columns
+
+    def __init__(self, vertices):
         '''
-        Constructs Triangle object
+        Constructs Polygon object
+
+        Args:
+            vertices - sequence of points (x, y), or array of floats x0, y0, x1, y1, ...
         '''
 
-        super().__init__(a, b, c)
-        self.a = a
-        self.b = b
-        self.c = c
+        if isinstance(vertices, array):
+            vertices = array('d', vertices)
+        else:
+            vertices = array('d', itertools.chain.from_iterable(vertices))
+        if not trusted.get():
+            self.check_dimensions(vertices)
+        object.__setattr__(self, 'vertices', vertices)
 
-    def get_area(self):
+    @staticmethod
+    def find_convexity(vertices):
         """
-        Calculates triangle area.
+        Checks if polygon is convex: it turns always in the same direction,
+        and goes around only once.
+
+        Args:
+            vertices: array of floats x0, y0, x1, y1, ...
 
         Returns:
-            float: area of the triangle
+            bool
         """
 
-        s = (self.a + self.b + self.c) / 2
-        self.get_area = float("{0:.2f}".format(math.sqrt(s*(s - self.a)*(s - self.b)*(s - self.c))))
-        return self.get_area
+        points = list(zip(vertices[0::2], vertices[1::2]))
+        points = [point for point, next_point in iter_edges(points) if point != next_point]
+        turns = []
+        for (x0, y0), (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1], points[2:] + points[:2]):
+            ax, ay, bx, by = x1 - x0, y1 - y0, x2 - x1, y2 - y1
+            turns.append(math.atan2(ax*by - ay*bx, ax*bx + ay*by))
+        if any(turn > 0 for turn in turns) and any(turn < 0 for turn in turns):
+            return False
 
-    def get_perimeter(self):
+        return abs(math.fsum(turns)) <= 2*math.pi + 1e-9
+
+    def is_convex(self):
         """
-        Calculates triangle perimeter.
+        Checks convexity of the polygon on the first call and caches it,
+        so polygons which are never checked do not pay for the loop over vertices.
 
         Returns:
-            float: perimeter of the triangle
+            bool: True if the polygon is convex
         """
 
-        self.get_perimeter = float("{0:.2f}".format(self.a + self.b + self.c))
-        return self.get_perimeter
+        try:
+            return self.convex
+        except AttributeError:
+            convex = self.find_convexity(self.vertices)
+            object.__setattr__(self, 'convex', convex)
+            return convex
 
-    @classmethod
-    def get_area_formula(cls):
+    def place(self, x, y, rotation=0):
         """
-        Returns formula for the area of the triangle as a string.
+        Creates copy of the polygon placed on the plane, sharing its convexity if it is already known.
 
         Returns:
-            str: area formula
+            Polygon: placed polygon with the same vertices
         """
 
-        return 'sqrt(s x (s-a)x(s-b)x(s-c)) \ns = (a+b+c)/2'
+        shape = super().place(x, y, rotation)
+        convex = getattr(self, 'convex', None)
+        if convex is not None:
+            object.__setattr__(shape, 'convex', convex)
+        return shape
 
-    @classmethod
-    def get_perimeter_formula(cls):
+    @staticmethod
+    def check_dimensions(vertices):
         """
-        Returns formula for the perimeter of the triangle as a string.
+        Checks coordinates of vertices.
+
+        Raises:
+            ValueError: If there are less than 3 vertices, or any coordinate is NaN, infinite
+                or its absolute value is above MAX_DIMENSION.
+        """
+        if len(vertices) < 6 or len(vertices) % 2:
+            raise ValueError('Polygon needs at least 3 vertices!')
+        total = sum(vertices)  # NaN if there is NaN among coordinates
+        if total != total or not -MAX_DIMENSION <= min(vertices) or not max(vertices) <= MAX_DIMENSION:
+            if not all(map(math.isfinite, vertices)):
+                raise ValueError('Number must be finite!')
+            raise ValueError('Number is too large!')
+
+    def get_dimensions(self):
+        """
+        Returns vertices of the polygon.
 
         Returns:
-            str: perimeter formula
+            tuple: one tuple of points (x, y)
         """
 
-        return 'a + b + c'
+        return (tuple(zip(self.vertices[0::2], self.vertices[1::2])),)
 
-    def __str__(self):
+    def get_arguments(self):
         """
-        Returns information about the triangle as string.
+        Returns arguments of the constructor creating the same polygon, not placed.
 
         Returns:
-            str: information about triangle
+            tuple: array of vertices, copied by the constructor without converting points
         """
 
-        return '{}, a = {}, b = {}, c = {}'.format(self.__class__.__name__, self.a, self.b, self.c)
+        return (self.vertices,)
 
+    @staticmethod
+    def get_buffer_area(vertices):
+        """
+        Calculates area of polygon with the shoelace formula.
 
-class EquilateralTriangle(Triangle):
-    '''This is class representing geometric figure: equilateral triangle
-    To inherit from Triangle.'''
+        Args:
+            vertices: array of floats x0, y0, x1, y1, ...
 
-    def __init__(self, a):
-        '''
-        Constructs EquilateralTriangle object
-        '''
+        Returns:
+            float: area of the polygon
+        """
 
-        super().__init__(a, a, a)
-        self.a = a
-        self.b = a
-        self.c = a
+        xs, ys = vertices[0::2], vertices[1::2]
+        next_xs, next_ys = xs[1:] + xs[:1], ys[1:] + ys[:1]
+        return abs(math.fsum(map(operator.mul, xs, next_ys)) - math.fsum(map(operator.mul, ys, next_xs))) / 2
 
-    @classmethod
-    def get_area_formula(cls):
+    @staticmethod
+    def get_buffer_perimeter(vertices):
         """
-        Returns formula for the area of the equilateral triangle as a string.
+        Calculates perimeter of polygon: sum of lengths of its edges.
+
+        Args:
+            vertices: array of floats x0, y0, x1, y1, ...
 
         Returns:
-            str: area formula
+            float: perimeter of the polygon
         """
 
-        return '(a^2 * sqrt(3)) / 4'
+        xs, ys = vertices[0::2], vertices[1::2]
+        next_xs, next_ys = xs[1:] + xs[:1], ys[1:] + ys[:1]
+        return math.fsum(map(math.hypot, map(operator.sub, next_xs, xs), map(operator.sub, next_ys, ys)))
 
-    @classmethod
-    def get_perimeter_formula(cls):
+    @cached_metric
+    def get_area(self):
         """
-        Returns formula for the perimeter of the equilateral triangle as a string.
+        Calculates polygon area.
 
         Returns:
-            str: perimeter formula
+            float: area of the polygon
         """
 
-        return '3*a'
+        return self.get_buffer_area(self.vertices)
 
-    def __str__(self):
+    @cached_metric
+    def get_perimeter(self):
         """
-        Returns information about the equilateral triangle as string.
+        Calculates polygon perimeter.
 
         Returns:
-            str: information about equilateral triangle
+            float: perimeter of the polygon
         """
 
-        return '{}, a = {}'.format(self.__class__.__name__, self.type, self.a)
+        return self.get_buffer_perimeter(self.vertices)
 
+    @classmethod
+    def areas(cls, vertices):
+        """
+        Calculates areas of many polygons at once, without creating polygon objects.
 
-class Rectangle(Shape):
-    '''This is class representing geometric figure: rectangle
-    To inherit from Shape.'''
+        Args:
+            vertices: sequence of arrays of floats x0, y0, x1, y1, ...
 
-    def __init__(self, a, b):
-        '''
-        Constructs Rectangle object
-        '''
+        Returns:
+            array: areas of the polygons
+        """
 
-        super().__init__(a, b)
-        self.a = a
-        self.b = b
+        return array('d', map(cls.get_buffer_area, vertices))
 
-    def get_area(self):
+    @classmethod
+    def perimeters(cls, vertices):
         """
-        Calculates rectangle area.
+        Calculates perimeters of many polygons at once, without creating polygon objects.
+
+        Args:
+            vertices: sequence of arrays of floats x0, y0, x1, y1, ...
 
         Returns:
-            float: area of the rectangle
+            array: perimeters of the polygons
         """
 
-        self.get_area = float("{0:.2f}".format(self.a * self.b))
-        return self.get_area
+        return array('d', map(cls.get_buffer_perimeter, vertices))
 
-    def get_perimeter(self):
+    def get_local_vertices(self):
         """
-        Calculates rectangle perimeter.
+        Returns vertices of the polygon centered at its centroid.
 
         Returns:
-            float: perimeter of the rectangle
+            list: tuples (x, y), counterclockwise
+        """
+
+        xs, ys = self.vertices[0::2], self.vertices[1::2]
+        next_xs, next_ys = xs[1:] + xs[:1], ys[1:] + ys[:1]
+        crosses = list(map(operator.sub, map(operator.mul, xs, next_ys), map(operator.mul, ys, next_xs)))
+        double_area = math.fsum(crosses)
+        if double_area:
+            cx = math.fsum(map(operator.mul, map(operator.add, xs, next_xs), crosses)) / (3*double_area)
+            cy = math.fsum(map(operator.mul, map(operator.add, ys, next_ys), crosses)) / (3*double_area)
+        else:
+            cx, cy = math.fsum(xs) / len(xs), math.fsum(ys) / len(ys)
+        points = [(x - cx, y - cy) for x, y in zip(xs, ys)]
+        return points if double_area >= 0 else points[::-1]
+
+    def contains_point(self, x, y):
+        """
+        Checks if point lies inside the placed polygon (even-odd rule), also concave one.
+
+        Returns:
+            bool
         """
 
-        self.get_perimeter = float("{0:.2f}".format(2*self.a + 2*self.b))
-        return self.get_perimeter
+        inside = False
+        vertices = self.get_vertices()
+        for (x1, y1), (x2, y2) in iter_edges(vertices):
+            if min(x1, x2) <= x <= max(x1, x2) and min(y1, y2) <= y <= max(y1, y2) and \
+                    (x2 - x1)*(y - y1) == (y2 - y1)*(x - x1):
+                return True  # points of the border are inside, as for convex shapes
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
 
     @classmethod
     def get_area_formula(cls):
         """
-        Returns formula for the area of the rectangle as a string.
+        Returns formula for the area of the polygon as a string.
 
         Returns:
             str: area formula
         """
 
-        return 'a*b'
+        return '|sum(x_i*y_(i+1) - x_(i+1)*y_i)| / 2'
 
     @classmethod
     def get_perimeter_formula(cls):
         """
-        Returns formula for the perimeter of the rectangle as a string.
+        Returns formula for the perimeter of the polygon as a string.
 
         Returns:
             str: perimeter formula
         """
 
-        return '2a + 2b'
+        return 'sum(|v_(i+1) - v_i|)'
 
     def __str__(self):
         """
-        Returns information about the rectangle as string.
+        Returns information about the polygon as string.
 
         Returns:
-            str: information about rectangle
+            str: information about polygon
         """
 
-        return '{}, a = {}, b = {}'.format(self.__class__.__name__, self.a, self.b)
+        return '{}, vertices = {}'.format(self.__class__.__name__, len(self.vertices) // 2)
 
 
-class Square(Rectangle):
-    '''This is class representing geometric figure: square
-    To inherit from Rectangle.'''
+class ShapeColumns:
+    '''This is class representing columnar storage of shapes.
+    Every shape kind (class) gets one typed array per dimension, so metrics of
+    a whole kind can be calculated at once, e.g. by ParallelEvaluator or storage.
+    Values of the float kernels are rounded, ShapeList itself uses exact metrics cached in shapes.'''
 
-    def __init__(self, a):
+    def __init__(self):
         '''
-        Constructs Square object
+        Constructs ShapeColumns object
         '''
 
-        super().__init__(a, a)
+        self.columns = {}  # kind -> list of arrays, one per dimension
+        self.members = {}  # kind -> list of shapes, in insertion order
 
-    @classmethod
-    def get_area_formula(cls):
-        """
-        Returns formula for the area of the square as a string.
+    def __len__(self):
+        return sum(len(members) for members in self.members.values())
 
-        Returns:
-            str: area formula
-        """
+    def append(self, shape):
+        '''
+        Add dimensions of the shape to the columns of its kind.
 
-        return 'a^2'
+        Args:
+            shape - object
+        '''
 
-    @classmethod
-    def get_perimeter_formula(cls):
-        """
-        Returns formula for the perimeter of the square as a string.
+        kind = type(shape)
+        columns = self.columns.get(kind)
+        if columns is None:
+            columns = self.columns[kind] = [array('d') for name in kind.dimensions]
+            self.members[kind] = []
+
+        for column, name in zip(columns, kind.dimensions):
+            column.append(getattr(shape, name))
+        self.members[kind].append(shape)
+
+    def get_metric(self, kind, metric):
+        '''
+        Calculate metric for all shapes of given kind at once.
+
+        Args:
+            kind - Shape class
+            metric - string, 'area' or 'perimeter'
 
         Returns:
-            str: perimeter formula
-        """
+            values - array of floats, in insertion order
+        '''
 
-        return '2*a'
+        if not kind.dimensions:
+            getter = 'get_' + metric
+            return array('d', [getattr(shape, getter)() for shape in self.members[kind]])
 
-    def __str__(self):
-        """
-        Returns information about the square as string.
+        kernel = kind.areas if metric == 'area' else kind.perimeters
+        return kernel(*self.columns[kind])
+
+    def find(self, shape):
+        '''
+        Find position of the shape in the columns of its kind.
+        Raise ValueError if the shape is not stored in columns.
+
+        Args:
+            shape - object
 
         Returns:
-            str: information about square
-        """
+            position - int
+        '''
 
-        return '{}, a = {}'.format(self.__class__.__name__, self.type, self.a)
+        for position, member in enumerate(self.members.get(type(shape), [])):
+            if member is shape:
+                return position
 
+        raise ValueError('Shape is not in columns!')
 
-class RegularPentagon(Shape):
-    '''This is class representing geometric figure: regular pentagon
-    To inherit from Shape.'''
+    def remove(self, shape, position=None):
+        '''
+        Remove dimensions of the shape from the columns of its kind.
+        Raise ValueError if the shape is not stored in columns.
 
-    def __init__(self, a):
+        Args:
+            shape - object
+            position - int, position of the shape found before (searched if None)
         '''
-        Constructs RegularPentagon object
+
+        if position is None:
+            position = self.find(shape)
+
+        kind = type(shape)
+        del self.members[kind][position]
+        for column in self.columns[kind]:
+            del column[position]
+
+    def iter_metric(self, shapes, metric):
         '''
+        Calculate metric for every shape, kind by kind, and yield values in order of shapes.
 
-        super().__init__(a)
-        self.a = a
+        Args:
+            shapes - list of shapes stored in columns, in insertion order
+            metric - string, 'area' or 'perimeter'
 
-    def get_area(self):
-        """
-        Calculates regular pentagon area.
+        Returns:
+            values - iterator of floats
+        '''
+
+        return self.merge(shapes, {kind: self.get_metric(kind, metric) for kind in self.members})
+
+    def merge(self, shapes, values):
+        '''
+        Merge metric values calculated separately for every kind into order of shapes.
+
+        Args:
+            shapes - list of shapes stored in columns, in insertion order
+            values - dict, kind -> sequence of values in insertion order
 
         Returns:
-            float: area of the regular pentagon
-        """
+            values - iterator of floats
+        '''
 
-        self.get_area = float("{0:.2f}".format((self.a**2 * math.sqrt(5*(5 + 2*math.sqrt(5))))/4))
-        return self.get_area
+        values = {kind: iter(kind_values) for kind, kind_values in values.items()}
+        for shape in shapes:
+            yield next(values[type(shape)])
 
-    def get_perimeter(self):
-        """
-        Calculates regular pentagon perimeter.
+
+class MetricIndex:
+    '''This is class representing shapes sorted by value of a metric (area or perimeter).
+    Shapes with equal values keep the order in which they were added.'''
+
+    def __init__(self, values, shapes):
+        '''
+        Constructs MetricIndex object
+
+        Args:
+            values - iterable of floats, metric of every shape
+            shapes - iterable of shapes, in insertion order
+        '''
+
+        pairs = sorted(zip(values, shapes), key=lambda pair: pair[0])
+        self.values = [value for value, shape in pairs]
+        self.shapes = [shape for value, shape in pairs]
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, value, shape):
+        '''
+        Insert shape into index, keeping it sorted.
+
+        Args:
+            value - float, metric of the shape
+            shape - object
+        '''
+
+        index = bisect.bisect_right(self.values, value)
+        self.values.insert(index, value)
+        self.shapes.insert(index, shape)
+
+    def find(self, value, shape):
+        '''
+        Find position of shape in index. Raise ValueError if shape is not in index.
+
+        Args:
+            value - float, metric of the shape
+            shape - object
 
         Returns:
-            float: perimeter of the regular pentagon
-        """
+            position - int
+        '''
 
-        self.get_perimeter = float("{0:.2f}".format(5*self.a))
-        return self.get_perimeter
+        low = bisect.bisect_left(self.values, value)
+        high = bisect.bisect_right(self.values, value)
+        for position in range(low, high):
+            if self.shapes[position] is shape:
+                return position
 
-    @classmethod
-    def get_area_formula(cls):
-        """
-        Returns formula for the area of the regular pentagon as a string.
+        raise ValueError('Shape is not in index!')
+
+    def remove(self, value, shape, position=None):
+        '''
+        Remove shape from index. Raise ValueError if shape is not in index.
+
+        Args:
+            value - float, metric of the shape
+            shape - object
+            position - int, position of the shape found before (searched if None)
+        '''
+
+        if position is None:
+            position = self.find(value, shape)
 
+        del self.values[position]
+        del self.shapes[position]
+
+    def get_smallest(self, k):
+        '''
         Returns:
-            str: area formula
-        """
+            shapes - list of k shapes with the smallest metric, ascending
+        '''
 
-        return '(a^2 * sqrt(5(5 + 2*sqrt(5)))) / 4'
+        return self.shapes[:max(k, 0)]
 
-    @classmethod
-    def get_perimeter_formula(cls):
-        """
-        Returns formula for the perimeter of the regular pentagon as a string.
+    def get_largest(self, k):
+        '''
+        Returns:
+            shapes - list of k shapes with the largest metric, descending
+            (shapes with equal values in order of adding)
+        '''
+
+        shapes = []
+        high = len(self.values)
+        while high > 0 and len(shapes) < k:
+            low = bisect.bisect_left(self.values, self.values[high - 1])
+            shapes.extend(self.shapes[low:high])
+            high = low
 
+        return shapes[:max(k, 0)]
+
+    def get_between(self, low, high):
+        '''
         Returns:
-            str: perimeter formula
-        """
+            shapes - list of shapes with metric in [low, high], ascending
+        '''
 
-        return '5*a'
+        return self.shapes[bisect.bisect_left(self.values, low):bisect.bisect_right(self.values, high)]
 
-    def __str__(self):
-        """
-        Returns information about the regular pentagon as string.
+    def get_percentile(self, percent):
+        '''
+        Find value of metric below which given percent of shapes falls (nearest-rank method).
+
+        Args:
+            percent - number from 0 to 100
 
         Returns:
-            str: information about regular pentagon
-        """
+            value - float (None if index is empty)
+        '''
+
+        if not 0 <= percent <= 100:
+            raise ValueError('Percent must be between 0 and 100!')
+        if not self.values:
+            return None
 
-        return '{}, a = {}'.format(self.__class__.__name__, self.a)
+        rank = max(math.ceil(percent / 100 * len(self.values)), 1)
+        return self.values[rank - 1]
 
 
 class ShapeList:
     '''This is class representing list of shapes'''
 
-    def __init__(self):
+    table_title = ('idx', 'Class', '__str__', 'Perimeter', 'Formula', 'Area', 'Formula')
+
+    def __init__(self, precision=None):
         '''
         Constructs ShapeList object
+
+        Args:
+            precision - number of decimal places shown in the table (DISPLAY_PRECISION by default)
         '''
 
         self.shapes = []
+        self.precision = precision
+        self.columns = ShapeColumns()
+        self.largest = {'area': (0, None), 'perimeter': (0, None)}  # metric -> (value, shape), missing if stale
+        self.indexes = {}  # metric -> MetricIndex, built on first query
+        self.spatial_index = None  # GridIndex of placed shapes, built on first spatial query
+        self.class_counts = collections.Counter()
 
     def add_shape(self, shape):
         '''
@@ -456,103 +2135,165 @@ class ShapeList:
         if not isinstance(shape, Shape):
             raise TypeError('Shape is not ancestor!')
         else:
+            metrics = (('area', shape.get_area()), ('perimeter', shape.get_perimeter()))  # nothing is added if they fail
+            spatial = self.spatial_index is not None and shape.get_placement() is not None
+            if spatial:
+                shape.get_bounds()
             self.shapes.append(shape)
+            self.columns.append(shape)
+            self.class_counts[shape.__class__.__name__] += 1
+            for metric, value in metrics:
+                self.update_largest(metric, value, shape)
+                if metric in self.indexes:
+                    self.indexes[metric].add(value, shape)
+            if spatial:
+                self.spatial_index.add(shape)
+
+    def add_shapes(self, shapes):
+        '''
+        Add many shapes to list shapes at once.
+        Raise TypeError (and add nothing) if any shape is not ancestor of Shape class,
+        errors of calculating metrics also leave the list unchanged.
 
-    def create_circle(self):
+        Args:
+            shapes - iterable of objects
+        '''
+
+        shapes = list(shapes)
+        for shape in shapes:
+            if not isinstance(shape, Shape):
+                raise TypeError('Shape is not ancestor!')
+        for shape in shapes:
+            shape.get_area()  # calculated before adding anything, then cached in the shape
+            shape.get_perimeter()
+        for shape in shapes:
+            self.add_shape(shape)
+
+    def remove_shape(self, shape):
+        '''
+        Remove shape from list shapes.
+        Raise ValueError if shape is not in the list (nothing is removed then).
+
+        Args:
+            shape - object
+        '''
+
+        index = self.shapes.index(shape)
+        figure = self.shapes[index]
+        position = self.columns.find(figure)
+        metrics = [(metric, getattr(figure, 'get_' + metric)()) for metric in self.indexes]
+        positions = [self.indexes[metric].find(value, figure) for metric, value in metrics]
+        if self.spatial_index is not None and figure.get_placement() is not None:
+            self.spatial_index.remove(figure)  # the last check, index is not changed if it fails
+
+        del self.shapes[index]
+        self.columns.remove(figure, position)
+        self.class_counts[figure.__class__.__name__] -= 1
+        for metric, (value, max_shape) in list(self.largest.items()):
+            if max_shape is figure:
+                del self.largest[metric]
+        for (metric, value), position in zip(metrics, positions):
+            self.indexes[metric].remove(value, figure, position)
+
+    def update_largest(self, metric, value, shape):
+        '''
+        Update the largest value of metric with newly added shape.
+
+        Args:
+            metric - string, 'area' or 'perimeter'
+            value - float, metric of the shape
+            shape - object
+        '''
+
+        largest = self.largest.get(metric)
+        if largest is not None and (largest[1] is None or value > largest[0]):
+            self.largest[metric] = (value, shape)
+
+    def create_from_input(self, kind):
         '''
-        Take radius from user, check correct format (int) and create new object of Circle class.
+        Take dimensions of registered kind from user, check correct format (number) and create new object.
+
+        Args:
+            kind - ShapeKind object
 
         Returns:
             shape - object
         '''
 
-        r = input('Write radius r: ')
-        self.is_digit(r)
-        shape = Circle(int(r))
+        dimensions = [input(prompt) for prompt in kind.prompts]
+        self.is_digit(*dimensions)
 
-        return shape
+        return kind.cls(*map(parse_number, dimensions))
 
-    def create_triangle(self):
+    def create_circle(self):
         '''
-        Take side a, b and from user, check correct format (int) and create new object of Triangle class.
+        Take dimensions from user, check correct format (number) and create new object of Circle class.
 
         Returns:
             shape - object
         '''
 
-        a = input('Write length side a: ')
-        b = input('Write length side b: ')
-        c = input('Write length side c: ')
-        self.is_digit(a, b, c)
-        shape = Triangle(int(a), int(b), int(c))
+        return self.create_from_input(SHAPE_KINDS['Circle'])
 
-        return shape
+    def create_triangle(self):
+        '''
+        Take dimensions from user, check correct format (number) and create new object of Triangle class.
+
+        Returns:
+            shape - object
+        '''
+
+        return self.create_from_input(SHAPE_KINDS['Triangle'])
 
     def create_equalateral_triangle(self):
         '''
-        Take side a from user, check correct format (int) and create new object of EquilateralTriangle class.
+        Take dimensions from user, check correct format (number) and create new object of EquilateralTriangle class.
 
         Returns:
             shape - object
         '''
 
-        a = input('Write length side a: ')
-        self.is_digit(a)
-        shape = EquilateralTriangle(int(a))
-
-        return shape
+        return self.create_from_input(SHAPE_KINDS['EquilateralTriangle'])
 
     def create_rectangle(self):
         '''
-        Take side a and b from user, check correct format (int) and create new object of Rectangle class.
+        Take dimensions from user, check correct format (number) and create new object of Rectangle class.
 
         Returns:
             shape - object
         '''
 
-        a = input('Write length side a: ')
-        b = input('Write length side b: ')
-        self.is_digit(a, b)
-        shape = Rectangle(int(a), int(b))
-
-        return shape
+        return self.create_from_input(SHAPE_KINDS['Rectangle'])
 
     def create_square(self):
         '''
-        Take side a from user, check correct format (int) and create new object of Square class.
+        Take dimensions from user, check correct format (number) and create new object of Square class.
 
         Returns:
             shape - object
         '''
 
-        a = input('Write length side a: ')
-        self.is_digit(a)
-        shape = Square(int(a))
-
-        return shape
+        return self.create_from_input(SHAPE_KINDS['Square'])
 
     def create_regular_pentagon(self):
         '''
-        Take side a from user, check correct format (int) and create new object of RegularPentagon class.
+        Take dimensions from user, check correct format (number) and create new object of RegularPentagon class.
 
         Returns:
             shape - object
         '''
 
-        a = input('Write length side a: ')
-        self.is_digit(a)
-        shape = RegularPentagon(int(a))
-
-        return shape
+        return self.create_from_input(SHAPE_KINDS['RegularPentagon'])
 
     def is_digit(self, *args):
         '''
-        Raise Value Error if some argument is not digit.
+        Raise Value Error if some argument is not number, e.g. "3", "2.5" or "1e3".
+        Numbers are read with the same rule as files, see parse_number,
+        values below 0 are rejected by constructors of shapes.
         '''
 
         for arg in args:
-            if not arg.isdigit():
-                raise ValueError('Parametr must be number!')
+            parse_number(arg)
 
     def choose_shape(self):
         '''
@@ -562,14 +2303,8 @@ class ShapeList:
             user_choice - string
         '''
 
-        print('''
-        1. Circle
-        2. Triangle
-        3. Equalateral Triangle
-        4. Rectangle
-        5. Square
-        6. Regular pentagon
-        ''')
+        kinds = sorted(MENU_KINDS.values(), key=lambda kind: (len(kind.key), kind.key))
+        print('\n' + ''.join('        {}. {}\n'.format(kind.key, kind.label) for kind in kinds))
 
         user_choice = input('Choose shape: ')
 
@@ -583,29 +2318,12 @@ class ShapeList:
             shape - object
         '''
 
-        if user_choice == '1':
-            shape = self.create_circle()
-
-        elif user_choice == '2':
-            shape = self.create_triangle()
-
-        elif user_choice == '3':
-            shape = self.create_equalateral_triangle()
-
-        elif user_choice == '4':
-            shape = self.create_rectangle()
-
-        elif user_choice == '5':
-            shape = self.create_square()
-
-        elif user_choice == '6':
-            shape = self.create_regular_pentagon()
-
-        else:
+        kind = MENU_KINDS.get(user_choice)
+        if kind is None:
             print('Bad choice')
-            shape = None
+            return None
 
-        return shape
+        return self.create_from_input(kind)
 
     def get_largest_shape_by_perimeter(self):
         '''
@@ -615,13 +2333,7 @@ class ShapeList:
             shape - object
         '''
 
-        largest_perimeter = 0
-        for figure in self.shapes:
-            if float(figure.get_perimeter()) > largest_perimeter:
-                largest_perimeter = figure.get_perimeter
-                max_shape_by_perimeter = figure
-
-        return max_shape_by_perimeter
+        return self.get_largest_shape('perimeter')
 
     def get_largest_shape_by_area(self):
         '''
@@ -631,13 +2343,193 @@ class ShapeList:
             shape - object
         '''
 
-        largest_area = 0
-        for figure in self.shapes:
-            if float(figure.get_area()) > largest_area:
-                largest_area = figure.get_area
-                max_shape_by_area = figure
+        return self.get_largest_shape('area')
+
+    def get_largest_shape(self, metric):
+        '''
+        Return the figure with the largest metric. The largest values are updated
+        by add_shape, and searched again only after removing the largest figure.
+
+        Args:
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            shape - object (None if shapes list is empty)
+        '''
+
+        if metric not in self.largest:
+            self.largest[metric] = self.find_largest(metric)
+
+        return self.largest[metric][1]
+
+    def find_largest(self, metric, maxima=None):
+        '''
+        Find the figure with the largest metric, using values cached in the figures.
+        If several figures share the largest value, the first added one wins.
+
+        Args:
+            metric - string, 'area' or 'perimeter'
+            maxima - list of tuples (value, shape), candidates calculated before
+
+        Returns:
+            (value, shape) - tuple (shape is None if shapes list is empty)
+        '''
+
+        if maxima is None:
+            values = list(map(operator.methodcaller('get_' + metric), self.shapes))  # cached by add_shape
+            if not values:
+                return 0, None
+            largest = max(values)
+            return largest, self.shapes[values.index(largest)]
+
+        largest_value = 0
+        max_shape = None
+        for value, figure in maxima:
+            if max_shape is None or value > largest_value:  # shapes may all have zero metric
+                largest_value = value
+                max_shape = figure
+            elif value == largest_value:
+                if self.shapes.index(figure) < self.shapes.index(max_shape):
+                    max_shape = figure
+
+        return largest_value, max_shape
+
+    def get_index(self, metric):
+        '''
+        Return shapes sorted by metric. Index is built on first use and then
+        kept up to date by add_shape and remove_shape.
+
+        Args:
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            index - MetricIndex object
+        '''
+
+        index = self.indexes.get(metric)
+        if index is None:
+            getter = 'get_' + metric  # the same values as in add_shape and remove_shape
+            index = self.indexes[metric] = MetricIndex([getattr(shape, getter)() for shape in self.shapes], self.shapes)
+
+        return index
+
+    def get_top_shapes(self, k, metric='area', largest=True):
+        '''
+        Find k shapes with the largest (or the smallest) metric.
+
+        Args:
+            k - int
+            metric - string, 'area' or 'perimeter'
+            largest - bool, False to find the smallest shapes
+
+        Returns:
+            shapes - list of shapes, from the most extreme one
+        '''
+
+        index = self.get_index(metric)
+        return index.get_largest(k) if largest else index.get_smallest(k)
+
+    def get_shapes_in_range(self, low, high, metric='area'):
+        '''
+        Find shapes with metric between low and high (inclusive).
+
+        Args:
+            low - float
+            high - float
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            shapes - list of shapes, sorted by metric
+        '''
+
+        return self.get_index(metric).get_between(low, high)
+
+    def get_percentile(self, percent, metric='area'):
+        '''
+        Find value of metric below which given percent of shapes falls, e.g. 50, 95 or 99.
+
+        Args:
+            percent - number from 0 to 100
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            value - float (None if shapes list is empty)
+        '''
+
+        return self.get_index(metric).get_percentile(percent)
+
+    def get_spatial_index(self):
+        '''
+        Return grid of placed shapes (shapes which are not placed are skipped).
+        Index is built on first use and then kept up to date by add_shape and remove_shape.
+
+        Returns:
+            index - GridIndex object
+        '''
+
+        if self.spatial_index is None:
+            self.spatial_index = GridIndex.from_shapes([shape for shape in self.shapes
+                                                        if shape.get_placement() is not None])
+
+        return self.spatial_index
+
+    def get_shapes_at(self, x, y):
+        '''
+        Find placed shapes containing point (x, y).
+
+        Returns:
+            shapes - list of shapes, in order of adding
+        '''
+
+        return self.get_spatial_index().get_at(x, y)
+
+    def get_shapes_in_window(self, xmin, ymin, xmax, ymax, contained=False):
+        '''
+        Find placed shapes overlapping window (or lying inside it).
+
+        Args:
+            xmin, ymin, xmax, ymax - numbers, corners of the window
+            contained - bool, True to find only shapes lying inside the window
+
+        Returns:
+            shapes - list of shapes, in order of adding
+        '''
+
+        if contained:
+            return self.get_spatial_index().get_contained((xmin, ymin, xmax, ymax))
+        window = Rectangle(xmax - xmin, ymax - ymin).place((xmin + xmax) / 2, (ymin + ymax) / 2)
+
+        return self.get_spatial_index().get_overlapping(window)
+
+    def get_overlapping_shapes(self, shape):
+        '''
+        Find placed shapes overlapping given placed shape.
+
+        Returns:
+            shapes - list of shapes, in order of adding
+        '''
+
+        return [other for other in self.get_spatial_index().get_overlapping(shape) if other is not shape]
+
+    def get_overlapping_pairs(self):
+        '''
+        Find all pairs of overlapping placed shapes.
+
+        Returns:
+            pairs - list of tuples (shape, shape), in order of adding
+        '''
+
+        return self.get_spatial_index().get_overlapping_pairs()
+
+    def count_by_class(self):
+        '''
+        Count shapes of every class.
+
+        Returns:
+            counts - dict, class name -> number of shapes
+        '''
 
-        return max_shape_by_area
+        return {name: count for name, count in self.class_counts.items() if count}
 
     def get_data_to_table(self):
         '''
@@ -647,24 +2539,128 @@ class ShapeList:
         Returns:
             rows_list - list of lists
         '''
-        rows_list = []
-        index = 0
-        title = ['idx', 'Class', '__str__', 'Perimeter', 'Formula', 'Area', 'Formula']
-        rows_list.append(title)
-        for figure in self.shapes:
-            row = [index,
-                   figure.__class__.__name__,
+        rows_list = [list(self.table_title)]
+        rows_list.extend(self.iter_data_rows())
+
+        return rows_list
+
+    def iter_data_rows(self, offset=0, limit=None):
+        '''
+        Create table rows one by one, without the title.
+
+        Args:
+            offset - int, index of the first shape
+            limit - int, max number of rows (all remaining shapes if None)
+
+        Returns:
+            rows - iterator of lists
+        '''
+
+        stop = None if limit is None else offset + limit
+        figures = self.shapes if offset == 0 and stop is None else self.shapes[offset:stop]
+        perimeters = map(operator.methodcaller('get_perimeter'), figures)  # cached by add_shape
+        areas = map(operator.methodcaller('get_area'), figures)
+
+        return self.make_data_rows(figures, perimeters, areas, offset)
+
+    def make_data_rows(self, figures, perimeters, areas, offset=0):
+        '''
+        Create table rows from figures and their metrics calculated before.
+        Metrics are always shown as floats, so int metrics of shapes with int dimensions
+        look the same as metrics calculated by float kernels, e.g. in ParallelEvaluator.
+
+        Args:
+            figures - iterable of shapes
+            perimeters - iterable of numbers
+            areas - iterable of numbers
+            offset - int, index of the first figure
+
+        Returns:
+            rows - iterator of lists
+        '''
+
+        formulas = {}  # class -> (area formula, perimeter formula), found once per class
+        for index, (figure, perimeter, area) in enumerate(zip(figures, perimeters, areas), offset):
+            kind = figure.__class__
+            if kind not in formulas:
+                formulas[kind] = kind.get_formulas()
+            yield [index,
+                   kind.__name__,
                    figure.__str__(),
-                   figure.get_perimeter(),
-                   figure.get_perimeter_formula(),
-                   figure.get_area(),
-                   figure.get_area_formula()
+                   format_number(float(perimeter), self.precision),
+                   formulas[kind][1],
+                   format_number(float(area), self.precision),
+                   formulas[kind][0]
                    ]
 
-            rows_list.append(row)
-            index += 1
+    def estimate_column_widths(self, sample_size=1000, offset=0):
+        '''
+        Estimate column widths from the title, rows evenly sampled from the whole list
+        and the first rows starting at offset. Cells wider than estimated widths overflow their column.
 
-        return rows_list
+        Args:
+            sample_size - int, max number of sampled rows
+            offset - int, index of the first shape shown
+
+        Returns:
+            widths - list of ints
+        '''
+
+        step = max(len(self.shapes) // sample_size, 1)
+        data = [self.table_title]
+        for index in range(0, len(self.shapes), step):
+            data.extend(self.iter_data_rows(index, 1))
+        data.extend(self.iter_data_rows(offset, sample_size))
+        data = [[str(item) for item in row] for row in data]
+
+        widths = self.find_column_widths(data)
+        widths[0] = max(widths[0], len(str(len(self.shapes) - 1)))
+
+        return widths
+
+    def iter_table_lines(self, offset=0, limit=None, widths=None, sample_size=1000):
+        '''
+        Format table line by line, without building the whole table in memory.
+
+        Args:
+            offset - int, index of the first shape
+            limit - int, max number of shapes (all remaining shapes if None)
+            widths - list of column widths (estimated from sample of rows if None)
+            sample_size - int, number of rows sampled to estimate widths
+
+        Returns:
+            lines - iterator of strings
+        '''
+
+        if widths is None:
+            widths = self.estimate_column_widths(sample_size, offset)
+        out_row = self.draw_out_row(None, self.table_title, widths)
+        for row in itertools.chain([self.table_title], self.iter_data_rows(offset, limit)):
+            yield out_row
+            yield self.draw_data_row(None, row, widths)
+        yield out_row
+
+    def write_table(self, file=None, offset=0, limit=None, page_size=1000, widths=None, sample_size=1000):
+        '''
+        Write table to file-like object, page by page.
+
+        Args:
+            file - object with write method (sys.stdout if None)
+            offset - int, index of the first shape
+            limit - int, max number of shapes (all remaining shapes if None)
+            page_size - int, number of lines written at once
+            widths - list of column widths (estimated from sample of rows if None)
+            sample_size - int, number of rows sampled to estimate widths
+        '''
+
+        if file is None:
+            file = sys.stdout
+        lines = self.iter_table_lines(offset, limit, widths, sample_size)
+        while True:
+            page = list(itertools.islice(lines, page_size))
+            if not page:
+                break
+            file.write('\n'.join(page) + '\n')
 
     def find_max_string(self, data, index):
         '''
@@ -685,69 +2681,93 @@ class ShapeList:
 
         return len(longest_string)
 
-    def draw_data_row(self, data, row):
+    def find_column_widths(self, data):
+        '''
+        Find max length of data in every column, in a single pass over the table.
+
+        Args:
+            data - list of lists (cells already converted to strings)
+
+        Returns:
+            widths - list of ints
+        '''
+
+        return [max(map(len, column)) for column in zip(*data)]
+
+    def draw_data_row(self, data, row, widths=None):
         '''
         Draw row with data (with proper width and format).
 
         Args:
             data - list of lists
             row - list
+            widths - list of column widths (searched in data if not given)
 
         Returns:
             row_data - string
         '''
 
-        row_data = '|'
         addit = 2
-        index = 0
-        for item in row:
-            max_string = self.find_max_string(data, index)
-            cell_width = max_string + addit
-            row_data = row_data + (str(item).center(cell_width, ' ')) + '|'
-            index += 1
+        if widths is None:
+            widths = [self.find_max_string(data, index) for index in range(len(row))]
+        cells = [str(item).center(width + addit, ' ') for item, width in zip(row, widths)]
 
-        return row_data
+        return '|' + '|'.join(cells) + '|'
 
-    def draw_out_row(self, data, row):
+    def draw_out_row(self, data, row, widths=None):
         '''
         Draw out row (with proper width and format).
 
         Args:
             data - list of lists
             row - list
+            widths - list of column widths (searched in data if not given)
 
         Returns:
             out_row - string
         '''
 
-        index = 0
         addit = 3
-        out_row = ''
-        for item in row:
-            max_string = self.find_max_string(data, index)
-            cell_width = max_string + addit
-            out_row += '-' * cell_width
-            index += 1
+        if widths is None:
+            widths = [self.find_max_string(data, index) for index in range(len(row))]
+
+        return '-' * (sum(widths) + addit * len(widths))
+
+    def format_table(self, data):
+        '''
+        Format rows of data into table. Every cell is converted to string once
+        and column widths are found once for the whole table.
+
+        Args:
+            data - list of lists
+
+        Returns:
+            table - string
+        '''
+
+        data = [[str(item) for item in row] for row in data]
+        widths = self.find_column_widths(data)
+        out_row = self.draw_out_row(data, data[0], widths)
+        lines = []
+        for row in data:
+            lines.append(out_row)
+            lines.append(self.draw_data_row(data, row, widths))
+        lines.append(out_row)
 
-        return out_row
+        return '\n'.join(lines)
 
     def get_shapes_table(self):
         '''
         Connection out row with data row and create proper table.
 
         Returns:
-            out_row - string
+            table - string
         '''
 
-        data = self.get_data_to_table()
-        for row in data:
-            out_row = self.draw_out_row(data, row)
-            print(out_row)
-            middle_row = self.draw_data_row(data, row)
-            print(middle_row)
-        print(out_row)
+        table = self.format_table(self.get_data_to_table())
+        print(table)
 
-        return out_row
+        return table
 
     def display_formula(self, user_choice):
         '''
@@ -757,26 +2777,135 @@ class ShapeList:
             user_choice - string
         '''
 
-        if user_choice == '1':
-            print("area: {}, \nperimeter: {}".format(Circle.get_area_formula(), Circle.get_perimeter_formula()))
+        kind = MENU_KINDS.get(user_choice)
+        if kind is None:
+            print('Bad choice')
+        else:
+            print("area: {}, \nperimeter: {}".format(*kind.get_formulas()))
 
-        elif user_choice == '2':
-            print("area: {}, \nperimeter: {}".format(Triangle.get_area_formula(), Triangle.get_perimeter_formula()))
 
-        elif user_choice == '3':
-            print("area: {}, \nperimeter: {}".format(EquilateralTriangle.get_area_formula(), EquilateralTriangle.get_perimeter_formula()))
+class ConcurrentShapeList:
+    '''This is class representing list of shapes shared by many threads.
+    Writers append under a short lock and publish new state (shapes, count, largest shapes)
+    with a single assignment. Readers never take the lock: they read the published state,
+    so they always see a consistent snapshot and never block writers.'''
 
-        elif user_choice == '4':
-            print("area: {}, \nperimeter: {}".format(Rectangle.get_area_formula(), Rectangle.get_perimeter_formula()))
+    def __init__(self, precision=None):
+        '''
+        Constructs ConcurrentShapeList object
 
-        elif user_choice == '5':
-            print("area: {}, \nperimeter: {}".format(Square.get_area_formula(), Square.get_perimeter_formula()))
+        Args:
+            precision - number of decimal places shown in the table (DISPLAY_PRECISION by default)
+        '''
 
-        elif user_choice == '6':
-            print("area: {}, \nperimeter: {}".format(RegularPentagon.get_area_formula(), RegularPentagon.get_perimeter_formula()))
+        self.precision = precision
+        self.lock = threading.Lock()  # taken by writers only
+        self.state = ([], 0, {'area': (0, None), 'perimeter': (0, None)})  # (shapes, count, largest)
 
-        else:
-            print('Bad choice')
+    def __len__(self):
+        return self.state[1]
+
+    def add_shape(self, shape):
+        '''
+        Add new shape to list shapes.
+        Raise TypeError if shape is not ancestor of Shape class.
+
+        Args:
+            shape - object
+        '''
+
+        self.add_shapes([shape])
+
+    def add_shapes(self, shapes):
+        '''
+        Add many shapes at once, publishing them together.
+        Raise TypeError (and add nothing) if any shape is not ancestor of Shape class.
+
+        Args:
+            shapes - iterable of objects
+        '''
+
+        shapes = list(shapes)
+        for shape in shapes:
+            if not isinstance(shape, Shape):
+                raise TypeError('Shape is not ancestor!')
+            shape.get_area()  # calculated before taking the lock, then cached in the shape
+            shape.get_perimeter()
+
+        with self.lock:
+            figures, count, largest = self.state
+            largest = dict(largest)
+            for shape in shapes:
+                for metric, value in (('area', shape.get_area()), ('perimeter', shape.get_perimeter())):
+                    if largest[metric][1] is None or value > largest[metric][0]:
+                        largest[metric] = (value, shape)
+            figures.extend(shapes)  # readers see only first count shapes, so extending is safe
+            self.state = (figures, count + len(shapes), largest)
+
+    def remove_shape(self, shape):
+        '''
+        Remove shape from list shapes. Readers keep using the old copy of the list.
+        Raise ValueError if shape is not in the list.
 
+        Args:
+            shape - object
+        '''
+
+        with self.lock:
+            figures, count, largest = self.state
+            figures = figures[:count]
+            del figures[figures.index(shape)]
+            largest = {'area': (0, None), 'perimeter': (0, None)}
+            for figure in figures:
+                for metric, value in (('area', figure.get_area()), ('perimeter', figure.get_perimeter())):
+                    if largest[metric][1] is None or value > largest[metric][0]:
+                        largest[metric] = (value, figure)
+            self.state = (figures, count - 1, largest)
+
+    def get_shapes(self):
+        '''
+        Returns:
+            shapes - list of shapes added so far (copy)
+        '''
+
+        figures, count, largest = self.state
+        return figures[:count]
+
+    def snapshot(self):
+        '''
+        Create ShapeList with shapes added so far, e.g. to run queries on it.
+
+        Returns:
+            shapes - ShapeList object
+        '''
+
+        shapes = ShapeList(self.precision)
+        shapes.add_shapes(self.get_shapes())
+
+        return shapes
+
+    def get_largest_shape_by_area(self):
+        '''
+        Returns:
+            shape - figure with the largest area
+        '''
+
+        return self.state[2]['area'][1]
+
+    def get_largest_shape_by_perimeter(self):
+        '''
+        Returns:
+            shape - figure with the largest perimeter
+        '''
+
+        return self.state[2]['perimeter'][1]
+
+    def get_shapes_table(self):
+        '''
+        Create table of shapes added so far.
 
+        Returns:
+            table - string
+        '''
 
+        return self.snapshot().get_shapes_table()
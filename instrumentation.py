@@ -0,0 +1,167 @@
+import bisect
+import functools
+import threading
+import time
+from geometry import Shape, ShapeList
+
+
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)  # upper bounds of latency histogram, in seconds
+SHAPE_METHODS = ('get_area', 'get_perimeter', '__str__')
+SHAPE_LIST_METHODS = ('add_shape', 'get_largest_shape_by_area', 'get_largest_shape_by_perimeter',
+                      'get_data_to_table', 'format_table', 'get_shapes_table')
+
+
+def iter_shape_classes(cls=Shape):
+    '''
+    Returns:
+        classes - iterator of all subclasses of cls
+    '''
+
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from iter_shape_classes(subclass)
+
+
+def default_targets():
+    '''
+    Find methods instrumented by default: metrics and __str__ of every shape class
+    (where they are defined) and main ShapeList operations.
+
+    Returns:
+        targets - list of tuples (class, method name)
+    '''
+
+    targets = []
+    for cls in iter_shape_classes():
+        targets.extend((cls, name) for name in SHAPE_METHODS if name in cls.__dict__)
+    targets.extend((ShapeList, name) for name in SHAPE_LIST_METHODS)
+
+    return targets
+
+
+class MethodStats:
+    '''This is class representing calls of one method: count, total time and histogram of latency'''
+
+    def __init__(self):
+        '''
+        Constructs MethodStats object
+        '''
+
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last bucket counts calls slower than all bounds
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+
+class Instrumentation:
+    '''This is class representing opt-in instrumentation of Shape and ShapeList methods.
+    Methods are wrapped only while instrumentation is enabled, and the original
+    methods are put back by disable(), so disabled instrumentation costs nothing.'''
+
+    def __init__(self, targets=None):
+        '''
+        Constructs Instrumentation object
+
+        Args:
+            targets - list of tuples (class, method name), default_targets() if None
+        '''
+
+        self.targets = default_targets() if targets is None else list(targets)
+        self.stats = {}  # "Class.method" -> MethodStats
+        self.originals = {}  # (class, method name) -> original method
+        self.lock = threading.Lock()
+
+    def wrap(self, name, method):
+        '''
+        Returns:
+            wrapper - function measuring calls of method
+        '''
+
+        stats = self.stats.setdefault(name, MethodStats())
+        lock = self.lock
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                with lock:
+                    stats.add(seconds)
+
+        return wrapper
+
+    def enable(self):
+        '''
+        Start measuring calls of target methods.
+        '''
+
+        for cls, name in self.targets:
+            if (cls, name) in self.originals:
+                continue
+            method = cls.__dict__[name]
+            self.originals[cls, name] = method
+            setattr(cls, name, self.wrap('{}.{}'.format(cls.__name__, name), method))
+
+    def disable(self):
+        '''
+        Stop measuring and put back original methods. Collected stats are kept.
+        '''
+
+        for (cls, name), method in self.originals.items():
+            setattr(cls, name, method)
+        self.originals = {}
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.disable()
+
+    def reset(self):
+        '''
+        Forget collected stats.
+        '''
+
+        with self.lock:
+            for stats in self.stats.values():
+                stats.__init__()
+
+    def snapshot(self):
+        '''
+        Returns:
+            stats - dict, "Class.method" -> dict with count, total_seconds and histogram
+                    (bucket upper bound -> number of calls)
+        '''
+
+        with self.lock:
+            return {name: {'count': stats.count,
+                           'total_seconds': stats.total,
+                           'histogram': dict(zip([str(bound) for bound in BUCKETS] + ['+Inf'], stats.buckets))}
+                    for name, stats in sorted(self.stats.items()) if stats.count}
+
+    def to_prometheus(self, metric='geometry_call_duration_seconds'):
+        '''
+        Dump collected stats as Prometheus histogram in text exposition format.
+
+        Returns:
+            text - string
+        '''
+
+        lines = ['# HELP {} Duration of geometry method calls.'.format(metric),
+                 '# TYPE {} histogram'.format(metric)]
+        for name, stats in self.snapshot().items():
+            cumulative = 0
+            for bound, count in stats['histogram'].items():
+                cumulative += count
+                lines.append('{}_bucket{{method="{}",le="{}"}} {}'.format(metric, name, bound, cumulative))
+            lines.append('{}_sum{{method="{}"}} {}'.format(metric, name, stats['total_seconds']))
+            lines.append('{}_count{{method="{}"}} {}'.format(metric, name, stats['count']))
+
+        return '\n'.join(lines) + '\n'
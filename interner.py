@@ -0,0 +1,113 @@
+import collections
+import threading
+
+
+class ShapeInterner:
+    '''This is class representing factory sharing shapes with the same dimensions.
+    Shapes are immutable, so one instance (with area and perimeter calculated once)
+    can be used everywhere instead of many equal copies. The least recently used
+    shapes are forgotten when there are more than maxsize of them.'''
+
+    def __init__(self, maxsize=100000):
+        '''
+        Constructs ShapeInterner object
+
+        Args:
+            maxsize - int, max number of kept shapes
+        '''
+
+        if maxsize < 1:
+            raise ValueError('Max size must be at least 1!')
+        self.maxsize = maxsize
+        self.shapes = collections.OrderedDict()  # key -> shape, from the least recently used
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def lookup(self, key, create):
+        '''
+        Find shape by key, or create and remember it.
+
+        Args:
+            key - hashable value
+            create - function returning new shape
+
+        Returns:
+            shape - object
+        '''
+
+        with self.lock:
+            shape = self.shapes.get(key)
+            if shape is not None:
+                self.shapes.move_to_end(key)
+                self.hits += 1
+                return shape
+
+        shape = create()
+        shape.get_area()  # calculated once, cached in the shared shape
+        shape.get_perimeter()
+
+        with self.lock:
+            self.misses += 1
+            shape = self.shapes.setdefault(key, shape)  # other thread could create it in the meantime
+            self.shapes.move_to_end(key)
+            while len(self.shapes) > self.maxsize:
+                self.shapes.popitem(last=False)
+                self.evictions += 1
+
+        return shape
+
+    def get(self, cls, *dimensions):
+        '''
+        Create shape of given class, or return shared one with the same dimensions.
+        Dimensions are validated by constructor only when the shape is created.
+
+        Args:
+            cls - Shape class
+            dimensions - numbers
+
+        Returns:
+            shape - object
+        '''
+
+        key = (cls, dimensions, tuple(map(type, dimensions)), None)  # types keep Circle(1) and Circle(1.0) apart
+        return self.lookup(key, lambda: cls(*dimensions))
+
+    def intern(self, shape):
+        '''
+        Return shared shape equal to given one (and the given shape if there was none).
+
+        Args:
+            shape - object
+
+        Returns:
+            shape - object
+        '''
+
+        dimensions = shape.get_dimensions()
+        key = (type(shape), dimensions, tuple(map(type, dimensions)), shape.get_placement())
+        return self.lookup(key, lambda: shape)
+
+    def clear(self):
+        '''
+        Forget all shapes and stats.
+        '''
+
+        with self.lock:
+            self.shapes.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def get_stats(self):
+        '''
+        Returns:
+            stats - dict with hits, misses, evictions, size and hit_rate
+        '''
+
+        with self.lock:
+            calls = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self.shapes), 'hit_rate': self.hits / calls if calls else 0.0}
@@ -0,0 +1,241 @@
+import csv
+import itertools
+import json
+import sys
+from geometry import parse_number, SHAPE_CLASSES
+
+
+FILE_FORMATS = ('csv', 'jsonl')
+
+
+class LoadReport:
+    '''This is class representing result of loading shapes from file'''
+
+    def __init__(self):
+        '''
+        Constructs LoadReport object
+        '''
+
+        self.loaded = 0
+        self.errors = []  # list of tuples (line number, message)
+
+    def add_error(self, line_number, message):
+        '''
+        Remember bad row.
+
+        Args:
+            line_number - int
+            message - string
+        '''
+
+        self.errors.append((line_number, message))
+
+    def __str__(self):
+        return 'Loaded shapes: {}, bad rows: {}'.format(self.loaded, len(self.errors))
+
+
+def parse_record(kind, dimensions):
+    '''
+    Find class of the shape and convert its dimensions to numbers.
+    Raise ValueError if kind is unknown or dimensions are wrong.
+
+    Args:
+        kind - string, name of shape's class
+        dimensions - list of values
+
+    Returns:
+        (cls, numbers) - tuple of Shape class and list of numbers
+    '''
+
+    cls = SHAPE_CLASSES.get(kind)
+    if cls is None:
+        raise ValueError('Unknown shape: {}'.format(kind))
+    if len(dimensions) != len(cls.dimensions):
+        raise ValueError('{} needs {} dimensions, got {}'.format(kind, len(cls.dimensions), len(dimensions)))
+
+    return cls, [parse_number(value) for value in dimensions]
+
+
+def create_shape(kind, dimensions, interner=None):
+    '''
+    Create shape of given kind. Dimensions are validated by shape's constructor.
+
+    Args:
+        kind - string, name of shape's class
+        dimensions - list of values
+        interner - ShapeInterner object sharing shapes with the same dimensions (new shape every time if None)
+
+    Returns:
+        shape - object
+    '''
+
+    cls, numbers = parse_record(kind, dimensions)
+    if interner is not None:
+        return interner.get(cls, *numbers)
+    return cls(*numbers)
+
+
+def iter_csv_records(file):
+    '''
+    Read shapes from CSV file: kind in first column, dimensions in following ones.
+    Header row starting with "kind" is skipped.
+
+    Args:
+        file - iterable of lines
+
+    Returns:
+        records - iterator of tuples (line number, kind, dimensions)
+    '''
+
+    for line_number, row in enumerate(csv.reader(file), 1):
+        if not row or (line_number == 1 and row[0].strip().lower() == 'kind'):
+            continue
+        yield line_number, row[0].strip(), [value.strip() for value in row[1:] if value.strip()]
+
+
+def iter_jsonl_records(file):
+    '''
+    Read shapes from JSON-lines file, one object per line, e.g. {"kind": "Circle", "r": 3}.
+
+    Args:
+        file - iterable of lines
+
+    Returns:
+        records - iterator of tuples (line number, kind, dimensions or error message)
+    '''
+
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            cls = SHAPE_CLASSES[record['kind']]
+            dimensions = [record[name] for name in cls.dimensions]
+        except ValueError as err:
+            yield line_number, None, 'Bad JSON: {}'.format(err)
+        except (KeyError, TypeError) as err:
+            yield line_number, None, 'Missing or unknown field: {}'.format(err)
+        else:
+            yield line_number, record['kind'], dimensions
+
+
+def iter_shapes(file, file_format='csv', report=None, interner=None):
+    '''
+    Read shapes from file, skipping bad rows. Metrics are calculated here,
+    so shapes whose metrics fail are reported as bad rows too.
+
+    Args:
+        file - iterable of lines
+        file_format - string, 'csv' or 'jsonl'
+        report - LoadReport object collecting bad rows
+        interner - ShapeInterner object sharing shapes with the same dimensions
+
+    Returns:
+        shapes - iterator of Shape objects
+    '''
+
+    if report is None:
+        report = LoadReport()
+    for line_number, kind, dimensions in iter_records(file, file_format, report):
+        try:
+            shape = create_shape(kind, dimensions, interner)
+            shape.get_area()
+            shape.get_perimeter()
+        except (ValueError, TypeError, ArithmeticError) as err:
+            report.add_error(line_number, ''.join(map(str, err.args)))
+        else:
+            yield shape
+
+
+def iter_records(file, file_format='csv', report=None):
+    '''
+    Read raw records from file, skipping rows which can not be parsed.
+
+    Args:
+        file - iterable of lines
+        file_format - string, 'csv' or 'jsonl'
+        report - LoadReport object collecting bad rows
+
+    Returns:
+        records - iterator of tuples (line number, kind, dimensions)
+    '''
+
+    if file_format not in FILE_FORMATS:
+        raise ValueError('Unknown file format: {}'.format(file_format))
+    if report is None:
+        report = LoadReport()
+    records = iter_csv_records(file) if file_format == 'csv' else iter_jsonl_records(file)
+
+    for line_number, kind, dimensions in records:
+        if kind is None:
+            report.add_error(line_number, dimensions)
+        else:
+            yield line_number, kind, dimensions
+
+
+def load_shapes(shape_list, file, file_format='csv', chunk_size=10000, interner=None):
+    '''
+    Load shapes from file into shape list, chunk by chunk.
+
+    Args:
+        shape_list - ShapeList object
+        file - iterable of lines
+        file_format - string, 'csv' or 'jsonl'
+        chunk_size - int, number of shapes added at once
+        interner - ShapeInterner object sharing shapes with the same dimensions
+
+    Returns:
+        report - LoadReport object
+    '''
+
+    report = LoadReport()
+    shapes = iter_shapes(file, file_format, report, interner)
+    while True:
+        chunk = list(itertools.islice(shapes, chunk_size))
+        if not chunk:
+            break
+        shape_list.add_shapes(chunk)
+        report.loaded += len(chunk)
+
+    return report
+
+
+def guess_format(path):
+    '''
+    Guess file format from file extension.
+
+    Args:
+        path - string
+
+    Returns:
+        file_format - string, 'csv' or 'jsonl'
+    '''
+
+    if path.endswith(('.jsonl', '.json', '.ndjson')):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+
+    raise ValueError('Can not guess format of {}, give it explicitly'.format(path))
+
+
+def load_file(shape_list, path, file_format=None, chunk_size=10000, interner=None):
+    '''
+    Load shapes from file (or standard input if path is "-") into shape list.
+
+    Args:
+        shape_list - ShapeList object
+        path - string
+        file_format - string, 'csv' or 'jsonl' (guessed from extension if None)
+        chunk_size - int, number of shapes added at once
+        interner - ShapeInterner object sharing shapes with the same dimensions
+
+    Returns:
+        report - LoadReport object
+    '''
+
+    if path == '-':
+        return load_shapes(shape_list, sys.stdin, file_format or 'csv', chunk_size, interner)
+
+    with open(path, newline='') as file:
+        return load_shapes(shape_list, file, file_format or guess_format(path), chunk_size, interner)
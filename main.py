@@ -1,13 +1,26 @@
+import argparse
+import csv
+import inspect
+import json
+import shlex
 import sys
+import time
 from geometry import *
+from interner import ShapeInterner
+import loader
+import storage
 
 
-def main():
+def main(shapes=None):
     '''
     Logic program
+
+    Args:
+        shapes - ShapeList object with shapes loaded before (empty list if None)
     '''
 
-    shapes = ShapeList()  # object containing all shapes added by the user
+    if shapes is None:
+        shapes = ShapeList()  # object containing all shapes added by the user
     while True:
 
         try:
@@ -33,11 +46,11 @@ def main():
 
             elif option == "3":
                 # Show shape with the largest perimeter
-                shapes.get_largest_shape_by_perimeter()
+                print(shapes.get_largest_shape_by_perimeter())
 
             elif option == "4":
                 # Show shape with the largest area
-                shapes.get_largest_shape_by_area
+                print(shapes.get_largest_shape_by_area())
 
             elif option == "5":
                 # Show formulas
@@ -58,6 +71,266 @@ def main():
         except TypeError as err:
             print(''.join(err.args))
 
+        except EOFError:
+            # Standard input is closed, e.g. it was used for data
+            print()
+            return
+
+
+def load(paths, file_format=None, save_path=None, intern=False):
+    '''
+    Load shapes from files into new shape list. Report bad rows on standard error.
+    Files with .geom extension are read as binary files saved before.
+
+    Args:
+        paths - list of file paths ("-" for standard input)
+        file_format - string, 'csv' or 'jsonl' (guessed from extension if None)
+        save_path - string, binary file to save loaded shapes to
+        intern - bool, True to share one shape object between rows with the same dimensions
+
+    Returns:
+        shapes - ShapeList object
+    '''
+
+    shapes = ShapeList()
+    interner = ShapeInterner() if intern else None
+    for path in paths:
+        if path.endswith('.geom'):
+            shapes.add_shapes(storage.load(path).shapes)
+            continue
+        report = loader.load_file(shapes, path, file_format, interner=interner)
+        for line_number, message in report.errors:
+            print('{}:{}: {}'.format(path, line_number, message), file=sys.stderr)
+        print('{}: {}'.format(path, report), file=sys.stderr)
+    if interner is not None:
+        print('Shared shapes: {size}, hit rate: {hit_rate:.1%}'.format(**interner.get_stats()), file=sys.stderr)
+    if save_path is not None:
+        storage.save(shapes, save_path)
+
+    return shapes
+
+
+def get_shape_class(kind):
+    '''
+    Find shape class by its name. Raise ValueError if there is no such shape.
+
+    Returns:
+        cls - Shape class
+    '''
+
+    cls = loader.SHAPE_CLASSES.get(kind)
+    if cls is None:
+        raise ValueError('Unknown shape: {}'.format(kind))
+
+    return cls
+
+
+def describe_shape(shape):
+    '''
+    Returns:
+        description - dict with information about shape, None if there is no shape
+    '''
+
+    if shape is None:
+        return None
+
+    return {'class': shape.__class__.__name__, 'shape': str(shape), 'dimensions': list(shape.get_dimensions()),
+            'area': shape.get_area(), 'perimeter': shape.get_perimeter()}
+
+
+def command_add(shapes, kind, *dimensions):
+    '''
+    Add shape, e.g. "add Triangle 3 4 5".
+    '''
+
+    shape = loader.create_shape(kind, list(dimensions))
+    shapes.add_shape(shape)
+
+    return describe_shape(shape)
+
+
+def command_load(shapes, path, file_format=None):
+    '''
+    Load shapes from CSV or JSON-lines file, e.g. "load shapes.csv".
+    '''
+
+    report = loader.load_file(shapes, path, file_format)
+
+    return {'loaded': report.loaded, 'errors': [{'line': line, 'message': message} for line, message in report.errors]}
+
+
+def command_table(shapes, offset='0', limit=None):
+    '''
+    Show rows of shapes table, e.g. "table" or "table 100 50".
+    '''
+
+    limit = None if limit is None else int(limit)
+    rows = shapes.iter_data_rows(int(offset), limit)
+
+    return [dict(zip(TABLE_KEYS, row)) for row in rows]
+
+
+def command_largest(shapes, metric):
+    '''
+    Show shape with the largest area or perimeter, e.g. "largest area".
+    '''
+
+    if metric not in ('area', 'perimeter'):
+        raise ValueError('Metric must be area or perimeter!')
+    return describe_shape(shapes.get_largest_shape(metric))
+
+
+def command_formula(shapes, kind):
+    '''
+    Show area and perimeter formula of shape, e.g. "formula Circle".
+    '''
+
+    cls = get_shape_class(kind)
+
+    return {'area': cls.get_area_formula(), 'perimeter': cls.get_perimeter_formula()}
+
+
+def command_count(shapes):
+    '''
+    Count shapes of every class.
+    '''
+
+    return {'total': len(shapes.shapes), 'classes': shapes.count_by_class()}
+
+
+TABLE_KEYS = ('idx', 'class', 'shape', 'perimeter', 'perimeter_formula', 'area', 'area_formula')
+COMMANDS = {
+    'add': command_add,
+    'load': command_load,
+    'table': command_table,
+    'largest': command_largest,
+    'formula': command_formula,
+    'count': command_count,
+}
+
+
+def run_command(shapes, line):
+    '''
+    Run one command, e.g. "add Circle 3". Raise ValueError if command is unknown or wrong.
+
+    Args:
+        shapes - ShapeList object
+        line - string
+
+    Returns:
+        result - value which can be written as JSON
+    '''
+
+    name, *args = shlex.split(line)
+    command = COMMANDS.get(name)
+    if command is None:
+        raise ValueError('Unknown command: {}'.format(name))
+    try:
+        inspect.signature(command).bind(shapes, *args)
+    except TypeError:
+        raise ValueError('Wrong arguments of command: {}'.format(line))
+
+    return command(shapes, *args)
+
+
+def run_batch(lines, shapes=None, output=None, output_format='json', timing=False):
+    '''
+    Run commands one per line (empty lines and lines starting with # are skipped)
+    and write result of every command as JSON line or CSV row.
+
+    Args:
+        lines - iterable of strings
+        shapes - ShapeList object (new empty list if None)
+        output - file-like object (sys.stdout if None)
+        output_format - string, 'json' or 'csv'
+        timing - bool, add time of every command in seconds
+
+    Returns:
+        errors - int, number of failed commands
+    '''
+
+    if shapes is None:
+        shapes = ShapeList()
+    if output is None:
+        output = sys.stdout
+    writer = csv.writer(output) if output_format == 'csv' else None
+    if writer is not None:
+        writer.writerow(['command', 'ok', 'result'] + (['seconds'] if timing else []))
+
+    errors = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        start = time.perf_counter()
+        try:
+            record = {'command': line, 'ok': True, 'result': run_command(shapes, line)}
+        except (ValueError, TypeError, ArithmeticError, OSError) as err:
+            record = {'command': line, 'ok': False, 'error': ''.join(map(str, err.args))}
+            errors += 1
+        if timing:
+            record['seconds'] = time.perf_counter() - start
+
+        if writer is None:
+            output.write(json.dumps(record) + '\n')
+        else:
+            result = json.dumps(record['result']) if record['ok'] else record['error']
+            writer.writerow([line, record['ok'], result] + ([record['seconds']] if timing else []))
+
+    return errors
+
+
+def parse_args(args=None):
+    '''
+    Parse command line arguments.
+
+    Returns:
+        arguments - argparse.Namespace
+    '''
+
+    parser = argparse.ArgumentParser(description='Geometry shapes')
+    commands = parser.add_subparsers(dest='command')
+    load_parser = commands.add_parser('load', help='load shapes from CSV, JSON-lines or .geom files, then show menu')
+    load_parser.add_argument('paths', nargs='+', help='files to load, "-" for standard input')
+    load_parser.add_argument('--format', choices=loader.FILE_FORMATS, help='file format (guessed from extension)')
+    load_parser.add_argument('--save', metavar='PATH', help='save loaded shapes to binary .geom file')
+    load_parser.add_argument('--intern', action='store_true', help='share one object between shapes with the same dimensions')
+    load_parser.add_argument('--no-menu', action='store_true',
+                             help='only load (and save) shapes, menu is not shown also if reading standard input or with --save')
+
+    batch_parser = commands.add_parser('batch', help='run commands from script without menu, e.g. "add Circle 3"')
+    batch_parser.add_argument('script', nargs='?', default='-', help='file with one command per line, "-" for standard input')
+    batch_parser.add_argument('--output', choices=('json', 'csv'), default='json', help='format of results')
+    batch_parser.add_argument('--timing', action='store_true', help='show time of every command')
+
+    return parser.parse_args(args)
+
+
+def shows_menu(arguments):
+    '''
+    Check if menu is shown after load command. Menu needs standard input, so it is not shown
+    when shapes are read from standard input, or when shapes are saved (e.g. in scripts).
+
+    Args:
+        arguments - argparse.Namespace of load command
+
+    Returns:
+        bool
+    '''
+
+    return not (arguments.no_menu or arguments.save or '-' in arguments.paths)
+
 
 if __name__ == "__main__":
-    main()
+    arguments = parse_args()
+    if arguments.command == 'load':
+        shapes = load(arguments.paths, arguments.format, arguments.save, arguments.intern)
+        if shows_menu(arguments):
+            main(shapes)
+    elif arguments.command == 'batch':
+        if arguments.script == '-':
+            sys.exit(1 if run_batch(sys.stdin, output_format=arguments.output, timing=arguments.timing) else 0)
+        with open(arguments.script) as script:
+            sys.exit(1 if run_batch(script, output_format=arguments.output, timing=arguments.timing) else 0)
+    else:
+        main()
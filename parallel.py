@@ -0,0 +1,218 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import math
+import operator
+
+
+def evaluate_chunk(kind, metric, columns):
+    '''
+    Calculate metric for a chunk of shapes of one kind. Runs in worker process.
+
+    Args:
+        kind - Shape class
+        metric - string, 'area' or 'perimeter'
+        columns - list of arrays, one per dimension
+
+    Returns:
+        values - array of floats
+    '''
+
+    kernel = kind.areas if metric == 'area' else kind.perimeters
+    return kernel(*columns)
+
+
+def find_chunk_maximum(kind, metric, columns):
+    '''
+    Find the largest metric in a chunk of shapes of one kind. Runs in worker process.
+
+    Returns:
+        (value, indexes) - tuple, indexes of all shapes with the largest value in chunk
+    '''
+
+    values = evaluate_chunk(kind, metric, columns)
+    largest = max(values)
+    return largest, [index for index, value in enumerate(values) if value == largest]
+
+
+def sum_chunk(kind, metric, columns):
+    '''
+    Sum metric of a chunk of shapes of one kind. Runs in worker process.
+
+    Returns:
+        total - float
+    '''
+
+    return math.fsum(evaluate_chunk(kind, metric, columns))
+
+
+class ParallelEvaluator:
+    '''This is class representing evaluation of ShapeList metrics on many processes.
+    Columns of every kind are split into chunks, chunks are evaluated by executor
+    and partial results are merged in order of chunks, so results do not depend on timing.'''
+
+    def __init__(self, workers=None, chunk_size=100000, executor=None):
+        '''
+        Constructs ParallelEvaluator object
+
+        Args:
+            workers - int, number of processes (number of CPUs if None)
+            chunk_size - int, number of shapes evaluated by one task
+            executor - concurrent.futures.Executor to use instead of new process pool,
+                       e.g. ThreadPoolExecutor
+        '''
+
+        self.chunk_size = chunk_size
+        self.own_executor = executor is None
+        self.executor = ProcessPoolExecutor(workers) if executor is None else executor
+
+    def close(self):
+        '''
+        Shut down process pool created by evaluator.
+        '''
+
+        if self.own_executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def iter_chunks(self, shape_list):
+        '''
+        Split columns of every kind into chunks.
+
+        Args:
+            shape_list - ShapeList object
+
+        Returns:
+            chunks - iterator of tuples (kind, start, list of column slices)
+        '''
+
+        for kind, columns in shape_list.columns.columns.items():
+            if not kind.dimensions:
+                continue
+            count = len(shape_list.columns.members[kind])
+            for start in range(0, count, self.chunk_size):
+                yield kind, start, [column[start:start + self.chunk_size] for column in columns]
+
+    def map_chunks(self, function, shape_list, metric):
+        '''
+        Run function on every chunk in executor.
+
+        Returns:
+            results - list of tuples (kind, start, result), in order of chunks
+        '''
+
+        chunks = list(self.iter_chunks(shape_list))
+        results = self.executor.map(function, [kind for kind, start, columns in chunks],
+                                    [metric] * len(chunks), [columns for kind, start, columns in chunks])
+
+        return [(kind, start, result) for (kind, start, columns), result in zip(chunks, results)]
+
+    def get_metrics(self, shape_list, metric):
+        '''
+        Calculate metric of every shape.
+
+        Args:
+            shape_list - ShapeList object
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            values - dict, kind -> array of floats in insertion order
+        '''
+
+        values = {kind: array('d') for kind in shape_list.columns.members}
+        for kind, start, result in self.map_chunks(evaluate_chunk, shape_list, metric):
+            values[kind].extend(result)
+        for kind in values:
+            if not kind.dimensions:
+                values[kind] = shape_list.columns.get_metric(kind, metric)
+
+        return values
+
+    def find_largest(self, shape_list, metric):
+        '''
+        Find the figure with the largest metric, with the same result as ShapeList.find_largest.
+
+        Args:
+            shape_list - ShapeList object
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            (value, shape) - tuple (shape is None if shapes list is empty)
+        '''
+
+        kind_maxima = {}  # kind -> (value, positions of all shapes with the value)
+        for kind, start, (value, indexes) in self.map_chunks(find_chunk_maximum, shape_list, metric):
+            positions = [start + index for index in indexes]
+            if kind not in kind_maxima or value > kind_maxima[kind][0]:
+                kind_maxima[kind] = (value, positions)
+            elif value == kind_maxima[kind][0]:
+                kind_maxima[kind][1].extend(positions)
+
+        # rounded kernel values only select candidates, exact values cached in shapes decide
+        getter = operator.methodcaller('get_' + metric)
+        maxima = []
+        for kind, (value, positions) in kind_maxima.items():
+            members = shape_list.columns.members[kind]
+            maxima.extend((getter(members[position]), members[position]) for position in positions)
+        for kind, members in shape_list.columns.members.items():
+            if not kind.dimensions:
+                maxima.extend((getter(shape), shape) for shape in members)
+
+        return shape_list.find_largest(metric, maxima)
+
+    def get_largest_shape_by_area(self, shape_list):
+        '''
+        Returns:
+            shape - figure with the largest area
+        '''
+
+        return self.find_largest(shape_list, 'area')[1]
+
+    def get_largest_shape_by_perimeter(self, shape_list):
+        '''
+        Returns:
+            shape - figure with the largest perimeter
+        '''
+
+        return self.find_largest(shape_list, 'perimeter')[1]
+
+    def get_total(self, shape_list, metric):
+        '''
+        Sum metric of all shapes.
+
+        Args:
+            shape_list - ShapeList object
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            total - float
+        '''
+
+        totals = [total for kind, start, total in self.map_chunks(sum_chunk, shape_list, metric)]
+        for kind in shape_list.columns.members:
+            if not kind.dimensions:
+                totals.extend(shape_list.columns.get_metric(kind, metric))
+
+        return math.fsum(totals)
+
+    def get_data_to_table(self, shape_list):
+        '''
+        Create table rows like ShapeList.get_data_to_table, with metrics calculated in parallel.
+
+        Args:
+            shape_list - ShapeList object
+
+        Returns:
+            rows_list - list of lists
+        '''
+
+        perimeters = shape_list.columns.merge(shape_list.shapes, self.get_metrics(shape_list, 'perimeter'))
+        areas = shape_list.columns.merge(shape_list.shapes, self.get_metrics(shape_list, 'area'))
+        rows_list = [list(shape_list.table_title)]
+        rows_list.extend(shape_list.make_data_rows(shape_list.shapes, perimeters, areas))
+
+        return rows_list
@@ -0,0 +1,193 @@
+from array import array
+import math
+import loader
+
+
+class Aggregate:
+    '''This is class representing summary of many shapes: totals, counts and maxima.
+    Aggregates of separate parts of data can be merged into one.'''
+
+    def __init__(self):
+        '''
+        Constructs Aggregate object
+        '''
+
+        self.count = 0
+        self.totals = {'area': 0.0, 'perimeter': 0.0}
+        self.class_counts = {}
+        self.largest = {'area': (0, None), 'perimeter': (0, None)}  # metric -> (value, shape)
+
+    def update(self, kind, columns):
+        '''
+        Add batch of shapes of one kind to aggregate.
+
+        Args:
+            kind - Shape class
+            columns - list of arrays, one per dimension
+        '''
+
+        count = len(columns[0])
+        if not count:
+            return
+        self.count += count
+        self.class_counts[kind.__name__] = self.class_counts.get(kind.__name__, 0) + count
+
+        for metric, values in (('area', kind.areas(*columns)), ('perimeter', kind.perimeters(*columns))):
+            self.totals[metric] += math.fsum(values)
+            largest = max(values)
+            if self.largest[metric][1] is None or largest > self.largest[metric][0]:
+                index = values.index(largest)
+                self.largest[metric] = (largest, kind(*[column[index] for column in columns]))
+
+    def merge(self, other):
+        '''
+        Merge other aggregate into this one. If both have the same largest value,
+        shape of this aggregate is kept.
+
+        Args:
+            other - Aggregate object
+        '''
+
+        self.count += other.count
+        for metric, total in other.totals.items():
+            self.totals[metric] += total
+        for name, count in other.class_counts.items():
+            self.class_counts[name] = self.class_counts.get(name, 0) + count
+        for metric, (value, shape) in other.largest.items():
+            if shape is not None and (self.largest[metric][1] is None or value > self.largest[metric][0]):
+                self.largest[metric] = (value, shape)
+
+    def to_dict(self):
+        '''
+        Returns:
+            summary - dict with plain values, e.g. for JSON output
+        '''
+
+        return {
+            'count': self.count,
+            'total_area': self.totals['area'],
+            'total_perimeter': self.totals['perimeter'],
+            'class_counts': dict(self.class_counts),
+            'largest_area': self.largest['area'][0],
+            'largest_area_shape': str(self.largest['area'][1]) if self.largest['area'][1] is not None else None,
+            'largest_perimeter': self.largest['perimeter'][0],
+            'largest_perimeter_shape': str(self.largest['perimeter'][1]) if self.largest['perimeter'][1] is not None else None,
+        }
+
+
+def iter_valid_records(records, report):
+    '''
+    Convert raw records to numbers and check them with the same rules as shape constructors,
+    without creating Shape objects.
+
+    Args:
+        records - iterable of tuples (line number, kind, dimensions)
+        report - loader.LoadReport object collecting bad rows
+
+    Returns:
+        records - iterator of tuples (Shape class, list of numbers)
+    '''
+
+    for line_number, kind, dimensions in records:
+        try:
+            cls, numbers = loader.parse_record(kind, dimensions)
+            cls.check_dimensions(*numbers)
+        except (ValueError, TypeError) as err:
+            report.add_error(line_number, ''.join(map(str, err.args)))
+        else:
+            yield cls, numbers
+
+
+def iter_batches(records, batch_size=65536):
+    '''
+    Group records into batches of columns, at most batch_size records per batch.
+
+    Args:
+        records - iterable of tuples (Shape class, list of numbers)
+        batch_size - int
+
+    Returns:
+        batches - iterator of dicts, kind -> list of arrays (one per dimension)
+    '''
+
+    batch = {}
+    size = 0
+    for cls, numbers in records:
+        columns = batch.get(cls)
+        if columns is None:
+            columns = batch[cls] = [array('d') for name in cls.dimensions]
+        for column, number in zip(columns, numbers):
+            column.append(number)
+        size += 1
+        if size == batch_size:
+            yield batch
+            batch = {}
+            size = 0
+    if batch:
+        yield batch
+
+
+def aggregate_records(records, batch_size=65536):
+    '''
+    Aggregate records batch by batch. Only one batch is kept in memory.
+
+    Args:
+        records - iterable of tuples (Shape class, list of numbers)
+        batch_size - int
+
+    Returns:
+        aggregate - Aggregate object
+    '''
+
+    aggregate = Aggregate()
+    for batch in iter_batches(records, batch_size):
+        for kind, columns in batch.items():
+            aggregate.update(kind, columns)
+
+    return aggregate
+
+
+def aggregate_file(file, file_format='csv', batch_size=65536, report=None):
+    '''
+    Aggregate shapes read lazily from CSV or JSON-lines file.
+
+    Args:
+        file - iterable of lines
+        file_format - string, 'csv' or 'jsonl'
+        batch_size - int
+        report - loader.LoadReport object collecting bad rows
+
+    Returns:
+        aggregate - Aggregate object
+    '''
+
+    if report is None:
+        report = loader.LoadReport()
+    aggregate = aggregate_records(iter_valid_records(loader.iter_records(file, file_format, report), report),
+                                  batch_size)
+    report.loaded += aggregate.count
+
+    return aggregate
+
+
+def aggregate_paths(paths, file_format=None, batch_size=65536):
+    '''
+    Aggregate shapes from many files, one file at a time, and merge the results.
+
+    Args:
+        paths - list of file paths
+        file_format - string, 'csv' or 'jsonl' (guessed from extension if None)
+        batch_size - int
+
+    Returns:
+        (aggregate, reports) - tuple of Aggregate object and dict path -> loader.LoadReport
+    '''
+
+    total = Aggregate()
+    reports = {}
+    for path in paths:
+        reports[path] = loader.LoadReport()
+        with open(path, newline='') as file:
+            total.merge(aggregate_file(file, file_format or loader.guess_format(path), batch_size, reports[path]))
+
+    return total, reports
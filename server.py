@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+from geometry import ShapeList
+import loader
+from main import run_command
+
+
+OFFLOADED_COMMANDS = ('load', 'table')  # commands run in executor, so they do not block other clients
+LINE_LIMIT = 64 * 1024 * 1024  # max length of one request line in bytes, e.g. big batch
+
+
+class ShapeServer:
+    '''This is class representing asyncio server sharing one ShapeList between many clients.
+    Every request is one JSON line, e.g. {"command": "add Circle 3"} or
+    {"command": "batch", "shapes": [["Circle", 3], ["Square", 2]]}, every response is one JSON line.'''
+
+    def __init__(self, shapes=None, executor=None):
+        '''
+        Constructs ShapeServer object
+
+        Args:
+            shapes - ShapeList object (new empty list if None)
+            executor - concurrent.futures.Executor for heavy commands (default executor of the loop if None)
+        '''
+
+        self.shapes = ShapeList() if shapes is None else shapes
+        self.executor = executor
+        self.lock = asyncio.Lock()  # held while shapes are used, also by commands running in executor
+
+    async def run_in_executor(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def handle_request(self, request):
+        '''
+        Run command from request.
+
+        Args:
+            request - dict
+
+        Returns:
+            result - value which can be written as JSON
+        '''
+
+        command = request.get('command')
+        if not isinstance(command, str) or not command.strip():
+            raise ValueError('Request needs command!')
+
+        if command == 'batch':
+            return await self.add_batch(request.get('shapes', []))
+
+        async with self.lock:
+            if command.split()[0] in OFFLOADED_COMMANDS:
+                return await self.run_in_executor(run_command, self.shapes, command)
+            return run_command(self.shapes, command)
+
+    async def add_batch(self, rows):
+        '''
+        Create shapes in executor and add them to shapes list. Bad rows are skipped.
+
+        Args:
+            rows - list of lists [kind, dimension, ...]
+
+        Returns:
+            result - dict with number of added shapes and errors of bad rows
+        '''
+
+        if not isinstance(rows, list):
+            raise ValueError('Shapes must be a list!')
+        shapes, errors = await self.run_in_executor(create_shapes, rows)
+        async with self.lock:
+            await self.run_in_executor(self.shapes.add_shapes, shapes)
+
+        return {'added': len(shapes), 'errors': errors}
+
+    async def handle_client(self, reader, writer):
+        '''
+        Answer requests of one client until it disconnects.
+        '''
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # the rest of too long line is still unread, so the connection can not be used any more
+                    response = {'ok': False, 'error': 'Request is longer than {} bytes!'.format(LINE_LIMIT)}
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('Request must be JSON object!')
+                    response = {'ok': True, 'result': await self.handle_request(request)}
+                except (ValueError, TypeError, ArithmeticError, OSError) as err:
+                    response = {'ok': False, 'error': ''.join(map(str, err.args))}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765, limit=LINE_LIMIT):
+        '''
+        Start listening for clients.
+
+        Args:
+            host - string
+            port - int
+            limit - int, max length of one request line in bytes
+
+        Returns:
+            server - asyncio.Server object
+        '''
+
+        return await asyncio.start_server(self.handle_client, host, port, limit=limit)
+
+
+def create_shapes(rows):
+    '''
+    Create shapes from rows [kind, dimension, ...], skipping bad rows.
+    Metrics are calculated here, so shapes whose metrics fail are bad rows too.
+
+    Returns:
+        (shapes, errors) - tuple of list of shapes and list of dicts describing bad rows
+    '''
+
+    shapes = []
+    errors = []
+    for index, row in enumerate(rows):
+        try:
+            if not isinstance(row, list) or not row:
+                raise ValueError('Shape must be a list [kind, dimension, ...]!')
+            shape = loader.create_shape(row[0], row[1:])
+            shape.get_area()
+            shape.get_perimeter()
+            shapes.append(shape)
+        except (ValueError, TypeError, ArithmeticError) as err:
+            errors.append({'index': index, 'message': ''.join(map(str, err.args))})
+
+    return shapes, errors
+
+
+async def serve(host, port):
+    server = await ShapeServer().start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Geometry shapes server (JSON lines over TCP)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    arguments = parser.parse_args()
+    asyncio.run(serve(arguments.host, arguments.port))
@@ -0,0 +1,240 @@
+import itertools
+import math
+
+
+MAX_SHAPE_CELLS = 64  # shapes touching more cells are kept in separate list
+
+
+class GridIndex:
+    '''This is class representing uniform grid of square cells over placed shapes.
+    Every shape is kept in all cells touched by its bounding box, so queries check
+    only shapes from cells near the searched point or area instead of all shapes.
+    Shapes much larger than cells are kept in separate list checked by every query.'''
+
+    def __init__(self, cell_size, max_shape_cells=MAX_SHAPE_CELLS):
+        '''
+        Constructs GridIndex object
+
+        Args:
+            cell_size - positive number, length of side of the cell
+            max_shape_cells - int, max number of cells of one shape, larger shapes are not put in cells
+        '''
+
+        if not 0 < cell_size < math.inf:
+            raise ValueError('Cell size must be positive!')
+        self.cell_size = cell_size
+        self.max_shape_cells = max_shape_cells
+        self.cells = {}  # (column, row) -> list of tuples (number, shape, bounds), in order of numbers
+        self.large = []  # tuples (number, shape, bounds) of shapes touching more than max_shape_cells cells
+        self.size = 0
+        self.next_number = 0  # number of the next added shape, results are sorted by these numbers
+
+    @classmethod
+    def from_shapes(cls, shapes):
+        '''
+        Create index with cell size equal to the average size of shapes.
+
+        Args:
+            shapes - list of placed shapes
+
+        Returns:
+            index - GridIndex object
+        '''
+
+        bounds = [shape.get_bounds() for shape in shapes]
+        sizes = [max(xmax - xmin, ymax - ymin) for xmin, ymin, xmax, ymax in bounds]
+        cell_size = math.fsum(sizes) / len(sizes) if sizes else 0
+        index = cls(cell_size if 0 < cell_size < math.inf else 1.0)
+        for shape in shapes:
+            index.add(shape)
+
+        return index
+
+    def __len__(self):
+        return self.size
+
+    def get_cell(self, x, y):
+        '''
+        Returns:
+            cell - tuple (column, row) of cell with point (x, y)
+        '''
+
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def iter_cells(self, bounds):
+        '''
+        Find cells touched by bounding box. Only cells with shapes are searched,
+        if the box touches more cells than there are in the index.
+
+        Args:
+            bounds - tuple (xmin, ymin, xmax, ymax)
+
+        Returns:
+            cells - iterator of tuples (column, row)
+        '''
+
+        first_column, first_row = self.get_cell(bounds[0], bounds[1])
+        last_column, last_row = self.get_cell(bounds[2], bounds[3])
+        if self.count_cells(bounds) > len(self.cells):
+            return [(column, row) for column, row in self.cells
+                    if first_column <= column <= last_column and first_row <= row <= last_row]
+
+        return ((column, row) for column in range(first_column, last_column + 1)
+                for row in range(first_row, last_row + 1))
+
+    def count_cells(self, bounds):
+        '''
+        Returns:
+            count - int, number of cells touched by bounding box
+        '''
+
+        first_column, first_row = self.get_cell(bounds[0], bounds[1])
+        last_column, last_row = self.get_cell(bounds[2], bounds[3])
+
+        return (last_column - first_column + 1) * (last_row - first_row + 1)
+
+    def add(self, shape):
+        '''
+        Add placed shape to index.
+
+        Args:
+            shape - object
+        '''
+
+        bounds = shape.get_bounds()
+        entry = (self.next_number, shape, bounds)
+        if self.count_cells(bounds) > self.max_shape_cells:
+            self.large.append(entry)
+        else:
+            first_column, first_row = self.get_cell(bounds[0], bounds[1])
+            last_column, last_row = self.get_cell(bounds[2], bounds[3])
+            for column in range(first_column, last_column + 1):
+                for row in range(first_row, last_row + 1):
+                    self.cells.setdefault((column, row), []).append(entry)
+        self.next_number += 1
+        self.size += 1
+
+    def remove(self, shape):
+        '''
+        Remove placed shape from index.
+        Raise ValueError if shape is not in the index.
+
+        Args:
+            shape - object
+        '''
+
+        bounds = shape.get_bounds()
+        if self.count_cells(bounds) > self.max_shape_cells:
+            for position, entry in enumerate(self.large):
+                if entry[1] is shape:
+                    del self.large[position]
+                    self.size -= 1
+                    return
+            raise ValueError('Shape is not in index!')
+
+        number = None
+        for cell in list(self.iter_cells(bounds)):
+            entries = self.cells.get(cell, [])
+            for position, entry in enumerate(entries):
+                if entry[1] is shape and (number is None or entry[0] == number):
+                    number = entry[0]
+                    del entries[position]
+                    break
+            if not entries:
+                self.cells.pop(cell, None)
+        if number is None:
+            raise ValueError('Shape is not in index!')
+        self.size -= 1
+
+    def iter_candidates(self, bounds):
+        '''
+        Find shapes whose bounding boxes intersect given box.
+
+        Args:
+            bounds - tuple (xmin, ymin, xmax, ymax)
+
+        Returns:
+            entries - list of tuples (number, shape, bounds), sorted by numbers
+        '''
+
+        xmin, ymin, xmax, ymax = bounds
+        found = {}
+        for entries in itertools.chain([self.large], map(self.cells.get, self.iter_cells(bounds))):
+            for entry in entries or ():
+                other = entry[2]
+                if other[0] <= xmax and xmin <= other[2] and other[1] <= ymax and ymin <= other[3]:
+                    found[entry[0]] = entry
+
+        return [found[number] for number in sorted(found)]
+
+    def get_at(self, x, y):
+        '''
+        Find shapes containing point (x, y).
+
+        Returns:
+            shapes - list of shapes, in order of adding
+        '''
+
+        entries = itertools.chain(self.large, self.cells.get(self.get_cell(x, y), ()))
+        entries = sorted(entries, key=lambda entry: entry[0])
+        return [shape for number, shape, bounds in entries
+                if bounds[0] <= x <= bounds[2] and bounds[1] <= y <= bounds[3] and shape.contains_point(x, y)]
+
+    def get_overlapping(self, shape):
+        '''
+        Find shapes overlapping placed shape (touching shapes overlap).
+
+        Args:
+            shape - object, does not have to be in the index
+
+        Returns:
+            shapes - list of shapes, in order of adding
+        '''
+
+        return [other for number, other, bounds in self.iter_candidates(shape.get_bounds()) if shape.overlaps(other)]
+
+    def get_contained(self, bounds):
+        '''
+        Find shapes lying inside box: shape lies inside the box if its bounding box does.
+
+        Args:
+            bounds - tuple (xmin, ymin, xmax, ymax)
+
+        Returns:
+            shapes - list of shapes, in order of adding
+        '''
+
+        xmin, ymin, xmax, ymax = bounds
+        return [shape for number, shape, other in self.iter_candidates(bounds)
+                if xmin <= other[0] and other[2] <= xmax and ymin <= other[1] and other[3] <= ymax]
+
+    def get_overlapping_pairs(self):
+        '''
+        Find all pairs of overlapping shapes. Pair of shapes sharing many cells is checked
+        only in the cell with the corner (xmin, ymin) of intersection of their bounding boxes.
+        Large shapes are checked with shapes found by their bounding boxes.
+
+        Returns:
+            pairs - list of tuples (shape, shape), in order of adding
+        '''
+
+        pairs = []
+        for cell, entries in self.cells.items():
+            for position, (number, shape, bounds) in enumerate(entries):
+                for other_number, other, other_bounds in entries[position + 1:]:
+                    if bounds[0] > other_bounds[2] or other_bounds[0] > bounds[2] or \
+                            bounds[1] > other_bounds[3] or other_bounds[1] > bounds[3]:
+                        continue
+                    if self.get_cell(max(bounds[0], other_bounds[0]), max(bounds[1], other_bounds[1])) != cell:
+                        continue
+                    if shape.overlaps(other):
+                        pairs.append((number, other_number, shape, other))
+        for number, shape, bounds in self.large:
+            for other_number, other, other_bounds in self.iter_candidates(bounds):
+                large = self.count_cells(other_bounds) > self.max_shape_cells
+                if (other_number > number or not large) and other_number != number and shape.overlaps(other):
+                    pairs.append((min(number, other_number), max(number, other_number),
+                                  *((shape, other) if number < other_number else (other, shape))))
+        pairs.sort(key=lambda pair: pair[:2])
+
+        return [(shape, other) for number, other_number, shape, other in pairs]
@@ -0,0 +1,327 @@
+from array import array
+import mmap
+import os
+import struct
+import sys
+from geometry import SHAPE_CLASSES, ShapeList, trusted_dimensions
+
+
+MAGIC = b'GEOM'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQ')  # magic, version, number of kinds, number of shapes
+KIND = struct.Struct('<32sHHIQQ')  # class name, dimensions, reserved, reserved, records, data offset
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def save(shape_list, path):
+    '''
+    Save shapes to binary file: header, table of kinds, order of shapes and
+    columns of float64 dimensions of every kind.
+
+    Args:
+        shape_list - ShapeList object
+        path - string
+    '''
+
+    kinds = list(shape_list.columns.columns)
+    for kind in kinds:
+        if SHAPE_CLASSES.get(kind.__name__) is not kind:
+            raise ValueError('Can not save shape: {}'.format(kind.__name__))
+    kind_ids = {kind: kind_id for kind_id, kind in enumerate(kinds)}
+
+    order_kinds = array('H')
+    order_records = array('I')
+    counts = [0] * len(kinds)
+    for shape in shape_list.shapes:
+        if shape.get_placement() is not None:
+            raise ValueError('Can not save placed shape: {!r}'.format(shape))
+        kind_id = kind_ids[type(shape)]
+        order_kinds.append(kind_id)
+        order_records.append(counts[kind_id])
+        counts[kind_id] += 1
+
+    offset = _align(HEADER.size + KIND.size * len(kinds))
+    offset = _align(offset + 2 * len(order_kinds))
+    offset = _align(offset + 4 * len(order_records))
+    kind_table = []
+    for kind in kinds:
+        count = len(shape_list.columns.members[kind])
+        kind_table.append(KIND.pack(kind.__name__.encode('ascii'), len(kind.dimensions), 0, 0, count, offset))
+        offset += 8 * count * len(kind.dimensions)
+
+    with open(path, 'wb') as file:
+        sections = [HEADER.pack(MAGIC, VERSION, len(kinds), len(shape_list.shapes))] + kind_table
+        sections += [_little_endian(order_kinds), _little_endian(order_records)]
+        for kind in kinds:
+            sections.extend(_little_endian(column) for column in shape_list.columns.columns[kind])
+        for section in sections:
+            file.write(section)
+            file.write(b'\0' * (_align(file.tell()) - file.tell()))
+
+
+class MappedShapes:
+    '''This is class representing shapes saved by save(), read straight from memory-mapped file.
+    Dimensions are not copied into Shape objects until they are needed.'''
+
+    def __init__(self, path):
+        '''
+        Constructs MappedShapes object. Raise ValueError if file has wrong format.
+
+        Args:
+            path - string
+        '''
+
+        self.path = path
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise ValueError('{} is not a shapes file!'.format(path))
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+
+        try:
+            self._read_tables()
+        except struct.error:
+            self.close()
+            raise ValueError('{} is truncated!'.format(path))
+        except ValueError:
+            self.close()
+            raise
+
+    def _read_tables(self):
+        path = self.path
+        magic, version, kinds_count, self.count = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a shapes file!'.format(path))
+
+        self.kinds = []  # list of Shape classes, in order of kind ids
+        self.columns = {}  # kind -> list of float64 columns
+        for kind_id in range(kinds_count):
+            name, dimensions, _, _, records, offset = KIND.unpack_from(self.buffer, HEADER.size + KIND.size * kind_id)
+            name = name.rstrip(b'\0').decode('ascii', errors='replace')
+            kind = SHAPE_CLASSES.get(name)
+            if kind is None or dimensions != len(kind.dimensions):
+                raise ValueError('{}: unknown shape {!r}!'.format(path, name))
+            self.kinds.append(kind)
+            self.columns[kind] = [self._read('d', offset + 8 * records * index, records) for index in range(dimensions)]
+
+        offset = _align(HEADER.size + KIND.size * kinds_count)
+        self.order_kinds = self._read('H', offset, self.count)
+        self.order_records = self._read('I', _align(offset + 2 * self.count), self.count)
+
+    def _read(self, typecode, offset, count):
+        size = array(typecode).itemsize
+        if offset + size * count > len(self.buffer):
+            raise ValueError('{} is truncated!'.format(self.path))
+        values = self.buffer[offset:offset + size * count].cast(typecode)
+        if sys.byteorder != 'little':
+            values = array(typecode, values)
+            values.byteswap()
+        return values
+
+    def close(self):
+        '''
+        Release memory-mapped file.
+        '''
+
+        for columns in getattr(self, 'columns', {}).values():
+            for column in columns:
+                if isinstance(column, memoryview):
+                    column.release()
+        for name in ('order_kinds', 'order_records'):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self.buffer.release()
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def get_shape(self, position):
+        '''
+        Create Shape object of shape saved on given position.
+
+        Args:
+            position - int
+
+        Returns:
+            shape - object
+        '''
+
+        return self.get_record(self.order_kinds[position], self.order_records[position])
+
+    def get_record(self, kind_id, record):
+        '''
+        Create Shape object from record of given kind.
+
+        Args:
+            kind_id - int, index of kind in kinds list
+            record - int, index of record in columns of the kind
+
+        Returns:
+            shape - object
+        '''
+
+        kind = self.kinds[kind_id]
+        dimensions = [column[record] for column in self.columns[kind]]
+
+        return kind(*[int(value) if value.is_integer() else value for value in dimensions])
+
+    def iter_shapes(self, offset=0, limit=None):
+        '''
+        Create Shape objects of saved shapes, one by one.
+
+        Args:
+            offset - int, position of the first shape
+            limit - int, max number of shapes (all remaining shapes if None)
+
+        Returns:
+            shapes - iterator of objects
+        '''
+
+        stop = self.count if limit is None else min(offset + limit, self.count)
+        for position in range(offset, stop):
+            yield self.get_shape(position)
+
+    def get_metric(self, kind, metric):
+        '''
+        Calculate metric for all saved shapes of given kind at once.
+
+        Args:
+            kind - Shape class
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            values - array of floats
+        '''
+
+        kernel = kind.areas if metric == 'area' else kind.perimeters
+        return kernel(*self.columns[kind])
+
+    def find_largest(self, metric):
+        '''
+        Find the saved shape with the largest metric. If several shapes share
+        the largest value, the first saved one wins.
+
+        Args:
+            metric - string, 'area' or 'perimeter'
+
+        Returns:
+            (value, shape) - tuple (shape is None if file is empty)
+        '''
+
+        largest_value = 0
+        largest = None  # (kind id, record)
+        for kind_id, kind in enumerate(self.kinds):
+            values = self.get_metric(kind, metric)
+            if not values:
+                continue
+            value = max(values)
+            candidate = (kind_id, values.index(value))
+            if largest is None or value > largest_value:  # shapes may all have zero metric
+                largest_value = value
+                largest = candidate
+            elif value == largest_value:
+                if self.find_position(*candidate) < self.find_position(*largest):
+                    largest = candidate
+
+        return largest_value, None if largest is None else self.get_record(*largest)
+
+    def find_position(self, kind_id, record):
+        '''
+        Find position of record of given kind among all saved shapes.
+
+        Returns:
+            position - int
+        '''
+
+        for position in range(self.count):
+            if self.order_kinds[position] == kind_id and self.order_records[position] == record:
+                return position
+
+        raise ValueError('Record not found!')
+
+    def get_largest_shape_by_area(self):
+        '''
+        Returns:
+            shape - saved shape with the largest area
+        '''
+
+        return self.find_largest('area')[1]
+
+    def get_largest_shape_by_perimeter(self):
+        '''
+        Returns:
+            shape - saved shape with the largest perimeter
+        '''
+
+        return self.find_largest('perimeter')[1]
+
+    def get_table_page(self, offset=0, limit=100, precision=None):
+        '''
+        Format table of saved shapes, building Shape objects only for the page.
+
+        Args:
+            offset - int, position of the first shape
+            limit - int, max number of shapes
+            precision - number of decimal places shown in the table
+
+        Returns:
+            table - string
+        '''
+
+        page = ShapeList(precision)
+        page.add_shapes(self.iter_shapes(offset, limit))
+        data = page.get_data_to_table()
+        for row in data[1:]:
+            row[0] += offset
+
+        return page.format_table(data)
+
+    def to_shape_list(self):
+        '''
+        Create ShapeList with all saved shapes. Columns are checked at once,
+        so shapes are created without checking every shape.
+
+        Returns:
+            shapes - ShapeList object
+        '''
+
+        for kind, columns in self.columns.items():
+            kind.check_columns(*columns)
+        shapes = ShapeList()
+        with trusted_dimensions():
+            shapes.add_shapes(self.iter_shapes())
+
+        return shapes
+
+
+def load(path):
+    '''
+    Load all shapes from binary file into ShapeList.
+
+    Args:
+        path - string
+
+    Returns:
+        shapes - ShapeList object
+    '''
+
+    with MappedShapes(path) as mapped:
+        return mapped.to_shape_list()
@@ -1,6 +1,27 @@
 import unittest
+import asyncio
+import csv
+import io
+import json
 import math
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
 from geometry import *
+import loader
+import storage
+import union
+import pipeline
+from parallel import ParallelEvaluator
+import main as cli
+from server import ShapeServer
+import bench
+from instrumentation import Instrumentation
+from interner import ShapeInterner
 from os import listdir
 
 
@@ -201,6 +222,1084 @@ class ShapeListTester(unittest.TestCase):
         self.assertEqual(sl.get_largest_shape_by_area(), c)
 
 
+class BatchMetricsTester(unittest.TestCase):
+
+    def test_circle(self):
+        self.assertEqual(list(Circle.areas([1, 2])), [math.pi, 4 * math.pi])
+        self.assertEqual(list(Circle.perimeters([1, 2])), [2 * math.pi, 4 * math.pi])
+
+    def test_triangle(self):
+        self.assertEqual(list(Triangle.areas([3], [4], [5])), [6])
+        self.assertEqual(list(Triangle.perimeters([3, 1], [4, 1], [5, 1])), [12, 3])
+
+    def test_subclasses(self):
+        self.assertEqual(list(Square.areas([2, 3])), [4, 9])
+        self.assertEqual(list(Square.perimeters([2])), [8])
+        self.assertEqual(list(EquilateralTriangle.perimeters([2])), [6])
+        self.assertEqual(list(Rectangle.areas([2], [3])), [6])
+        self.assertEqual(list(RegularPentagon.perimeters([2])), [10])
+
+    def test_empty(self):
+        self.assertEqual(len(Circle.areas([])), 0)
+
+
+class PrecisionTester(unittest.TestCase):
+
+    def test_format_number(self):
+        self.assertEqual(format_number(3), '3')
+        self.assertEqual(format_number(math.pi), '3.14')
+        self.assertEqual(format_number(math.pi, 4), '3.1416')
+
+    def test_rounded_metrics(self):
+        c = Circle(3)
+        self.assertEqual(c.get_rounded_area(), 28.27)
+        self.assertEqual(c.get_rounded_perimeter(1), 18.8)
+
+    def test_table_precision(self):
+        sl = ShapeList(precision=3)
+        sl.add_shape(Circle(1))
+        row = sl.get_data_to_table()[1]
+        self.assertEqual((row[3], row[5]), ('6.283', '3.142'))
+
+    def test_str(self):
+        self.assertEqual(str(Square(2.5)), 'Square, a = 2.50')
+        self.assertEqual(str(EquilateralTriangle(2)), 'EquilateralTriangle, a = 2')
+
+
+class FormulaCacheTester(unittest.TestCase):
+
+    def test_circle_formulas(self):
+        self.assertEqual(Circle.get_area_formula(), '3.14x r^2')
+        self.assertEqual(Circle.get_perimeter_formula(), '2 x 3.14 x r')
+        self.assertEqual(Circle.get_formulas(4, ','), ('3,1416x r^2', '2 x 3,1416 x r'))
+
+    def test_cached(self):
+        format_formulas.cache_clear()
+        Circle.get_formulas()
+        Circle.get_formulas()
+        Square.get_formulas(3)
+        info = format_formulas.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 2))
+        self.assertEqual(Square.get_formulas(), (Square.get_area_formula(), Square.get_perimeter_formula()))
+
+    def test_constants(self):
+        self.assertEqual(RegularPentagon(2).get_area(), (4 * math.sqrt(5 * (5 + 2 * math.sqrt(5)))) / 4)
+        self.assertEqual(get_polygon_divisor(6), 4 * math.tan(math.pi / 6))
+        self.assertEqual(list(RegularPolygon.areas([6], [2])), [RegularPolygon(6, 2).get_area()])
+        self.assertEqual(get_polygon_divisor.cache_info().maxsize, POLYGON_CACHE_SIZE)
+
+    def test_table_formulas(self):
+        sl = ShapeList()
+        sl.add_shapes([Circle(1), Square(2), Circle(3)])
+        rows = sl.get_data_to_table()
+        self.assertEqual([(row[4], row[6]) for row in rows[1:]],
+                         [('2 x 3.14 x r', '3.14x r^2'), ('2*a', 'a^2'), ('2 x 3.14 x r', '3.14x r^2')])
+
+
+class CachedMetricTester(unittest.TestCase):
+
+    def test_repeated_calls(self):
+        t = Triangle(3, 4, 5)
+        self.assertEqual(t.get_area(), 6)
+        self.assertEqual(t.get_area(), 6)
+        self.assertEqual(t.get_perimeter(), 12)
+        self.assertEqual(t.get_perimeter(), 12)
+
+    def test_cached(self):
+        r = Rectangle(2, 3)
+        r.get_area()
+        self.assertEqual(r._area, 6)
+
+    def test_immutable(self):
+        c = Circle(1)
+        self.assertEqual(c.get_area(), math.pi)
+        with self.assertRaises(AttributeError):
+            c.r = 2
+        with self.assertRaises(AttributeError):
+            c._area = 0
+        with self.assertRaises(AttributeError):
+            c._perimeter = 0  # not calculated yet
+        self.assertEqual(c.get_area(), math.pi)
+        self.assertEqual(c.get_perimeter(), 2 * math.pi)
+
+    def test_pickle(self):
+        for shape in (Circle(2), Triangle(3, 4, 5).place(1, 2, 0.5), Polygon([(0, 0), (2, 0), (0, 1)])):
+            shape.get_area()
+            copy = pickle.loads(pickle.dumps(shape))
+            self.assertEqual(copy, shape)
+            self.assertEqual(copy.get_area(), shape.get_area())
+
+
+class ValueShapeTester(unittest.TestCase):
+
+    def test_slots(self):
+        for shape in (Circle(1), Triangle(3, 4, 5), EquilateralTriangle(1),
+                      Rectangle(1, 2), Square(1), RegularPentagon(1)):
+            self.assertFalse(hasattr(shape, '__dict__'), type(shape).__name__)
+
+    def test_equality(self):
+        self.assertEqual(Triangle(3, 4, 5), Triangle(3, 4, 5))
+        self.assertNotEqual(Triangle(3, 4, 5), Triangle(3, 5, 4))
+        self.assertNotEqual(Square(2), Rectangle(2, 2))
+
+    def test_hash(self):
+        shapes = {Circle(1), Circle(1), Square(2), Square(2), Square(3)}
+        self.assertEqual(len(shapes), 3)
+
+    def test_repr(self):
+        self.assertEqual(repr(Rectangle(2, 3.5)), 'Rectangle(2, 3.5)')
+
+
+class ValidationTester(unittest.TestCase):
+
+    def test_not_finite(self):
+        for value in (math.nan, math.inf, -1):
+            with self.assertRaises(ValueError):
+                Circle(value)
+
+    def test_triangle_inequality(self):
+        with self.assertRaises(ValueError):
+            Triangle(1, 2, 5)
+        self.assertEqual(Triangle(1, 2, 3).get_area(), 0)
+        self.assertEqual(EquilateralTriangle(2).get_perimeter(), 6)
+
+    def test_columns(self):
+        Rectangle.check_columns(array('d', [1, 2.5]), [3, 4])
+        for columns in (([1, -2], [1, 1]), ([1, math.nan], [1, 1]), ([1, 1], [math.inf, 1])):
+            with self.assertRaises(ValueError):
+                Rectangle.check_columns(*columns)
+        with self.assertRaises(ValueError):
+            Triangle.check_columns([3, 1], [4, 1], [5, 3])
+        Shape.check_columns([1e75, 1e75])
+
+    def test_trusted(self):
+        with trusted_dimensions():
+            c = Circle(-1)
+        self.assertEqual(c.r, -1)
+        with self.assertRaises(ValueError):
+            Circle(-1)
+
+    def test_decimal_strings(self):
+        sl = ShapeList()
+        sl.is_digit('3', '2.5', '.5', '1e3', '-1')
+        for value in ('nan', 'inf', '1_000', '0x10', ''):
+            with self.assertRaises(ValueError):
+                sl.is_digit(value)
+            with self.assertRaises(ValueError):
+                parse_number(value)
+        self.assertEqual(parse_number('2.5'), 2.5)
+        self.assertEqual(parse_number('3'), 3)
+        self.assertEqual(parse_number(' 1e3 '), 1000.0)
+
+    def test_too_large(self):
+        for create in (lambda: RegularPentagon(1e200), lambda: RegularPolygon(5, 1e200),
+                       lambda: Circle(10**400), lambda: Triangle(1e100, 1e100, 1e100)):
+            with self.assertRaises(ValueError):
+                create()
+        with self.assertRaises(ValueError):
+            RegularPentagon.check_columns([1, 1e200])
+        with self.assertRaises(ValueError):
+            Square.check_columns([1, 10**400])
+        self.assertEqual(RegularPentagon(MAX_DIMENSION).get_area(), RegularPentagon.areas([MAX_DIMENSION])[0])
+        self.assertLess(Triangle(MAX_DIMENSION, MAX_DIMENSION, MAX_DIMENSION).get_area(), math.inf)
+
+
+class ShapeRegistryTester(unittest.TestCase):
+
+    def test_registry(self):
+        self.assertEqual(sorted(MENU_KINDS), ['1', '2', '3', '4', '5', '6', '7'])
+        self.assertIs(SHAPE_CLASSES['Square'], Square)
+        self.assertIs(loader.SHAPE_CLASSES, SHAPE_CLASSES)
+        self.assertEqual(SHAPE_KINDS['Circle'].get_formulas(), (Circle.get_area_formula(), Circle.get_perimeter_formula()))
+
+    def test_create_shape(self):
+        sl = ShapeList()
+        with mock.patch('builtins.input', side_effect=['2', '3.5']):
+            self.assertEqual(sl.create_shape('4'), Rectangle(2, 3.5))
+        with mock.patch('builtins.input', side_effect=['3']), mock.patch('builtins.print'):
+            self.assertEqual(sl.create_circle(), Circle(3))
+            self.assertIsNone(sl.create_shape('9'))
+
+    def test_register_errors(self):
+        with self.assertRaises(ValueError):
+            register_shape('1', 'Other circle', 'Write radius r: ')(Circle)
+        with self.assertRaises(ValueError):
+            register_shape('99', 'Rectangle', 'Write length side a: ')(Rectangle)
+
+
+class SpatialTester(unittest.TestCase):
+
+    def setUp(self):
+        self.circle = Circle(1).place(0, 0)
+        self.rectangle = Rectangle(2, 1).place(2.5, 0)
+        self.triangle = Triangle(3, 4, 5).place(0, 0, math.pi / 4)
+        self.sl = ShapeList()
+        self.sl.add_shapes([self.circle, Circle(5), self.rectangle, self.triangle])
+
+    def test_place(self):
+        self.assertIsNone(Circle(1).get_placement())
+        self.assertEqual(self.rectangle.get_bounds(), (1.5, -0.5, 3.5, 0.5))
+        self.assertNotEqual(self.circle, Circle(1))
+        self.assertEqual(self.circle, Circle(1).place(0, 0))
+        self.assertEqual(repr(self.rectangle), 'Rectangle(2, 1).place(2.5, 0, 0)')
+        with self.assertRaises(ValueError):
+            Circle(1).get_bounds()
+        with self.assertRaises(ValueError):
+            Circle(1).place(math.nan, 0)
+
+    def test_overlaps(self):
+        self.assertFalse(self.circle.overlaps(self.rectangle))
+        self.assertTrue(Circle(1).place(1.6, 0).overlaps(self.rectangle))
+        self.assertFalse(Square(2).place(0, 0, math.pi / 4).overlaps(Square(2).place(2.5, 0)))
+        self.assertTrue(Square(2).place(0, 0).overlaps(Square(2).place(2, 0)))
+        self.assertTrue(RegularPentagon(1).place(0, 0).contains_point(0, 0.85))
+
+    def test_queries(self):
+        self.assertEqual(self.sl.get_shapes_at(0, 0), [self.circle, self.triangle])
+        self.assertEqual(self.sl.get_shapes_in_window(-2, -2, 4, 2, contained=True), [self.circle, self.rectangle])
+        self.assertEqual(self.sl.get_overlapping_pairs(), [(self.circle, self.triangle), (self.rectangle, self.triangle)])
+        self.assertEqual(self.sl.get_overlapping_shapes(self.triangle), [self.circle, self.rectangle])
+
+    def test_updates(self):
+        self.sl.get_spatial_index()
+        square = Square(1).place(0, 0)
+        self.sl.add_shape(square)
+        self.sl.remove_shape(self.triangle)
+        self.assertEqual(self.sl.get_shapes_at(0, 0), [self.circle, square])
+        self.assertEqual(len(self.sl.get_spatial_index()), 3)
+
+    def test_large_shape(self):
+        sl = ShapeList()
+        sl.add_shapes([Circle(0.01).place(i, 0) for i in range(10)])
+        sl.get_spatial_index()
+        big = Rectangle(100, 100).place(0, 0)
+        sl.add_shape(big)
+        self.assertEqual(len(sl.get_spatial_index().large), 1)
+        self.assertEqual(sl.get_shapes_at(20, 20), [big])
+        self.assertEqual(len(sl.get_overlapping_pairs()), 10)
+        self.assertEqual(sl.get_shapes_in_window(-60, -60, 60, 60, contained=True)[-1], big)
+        sl.remove_shape(big)
+        self.assertEqual(sl.get_shapes_at(20, 20), [])
+
+    def test_pairs_match_brute_force(self):
+        shapes = [kind.place(i % 7 * 1.5, i // 7 * 1.5, i / 10) for i, kind in
+                  enumerate([Circle(1), Rectangle(2, 1), Triangle(3, 4, 5), RegularPentagon(1), Square(1)] * 10)]
+        shapes += [Rectangle(30, 2).place(5, 5), Circle(40).place(0, 0), Circle(0.1).place(40, 40)]
+        sl = ShapeList()
+        sl.add_shapes(shapes)
+        self.assertEqual(len(sl.get_spatial_index().large), 1)
+        brute = [(a, b) for i, a in enumerate(shapes) for b in shapes[i + 1:] if a.overlaps(b)]
+        self.assertEqual(sl.get_overlapping_pairs(), brute)
+
+
+class CoveredAreaTester(unittest.TestCase):
+
+    def test_rectangles_exact(self):
+        shapes = [Rectangle(2, 2).place(0, 0), Rectangle(2, 2).place(1, 1), Square(1).place(10, 10),
+                  Rectangle(4, 1).place(0, 0, math.pi / 2)]
+        area, error = union.get_covered_area(shapes)
+        self.assertAlmostEqual(area, 9.5)
+        self.assertEqual(error, 0)
+
+    def test_error_bound(self):
+        distance = 1
+        lens = 2 * math.acos(distance / 2) - distance / 2 * math.sqrt(4 - distance ** 2)
+        area, error = union.get_covered_area([Circle(1).place(0, 0), Circle(1).place(distance, 0)], 0.001)
+        self.assertLessEqual(abs(area - (2 * math.pi - lens)), error)
+        self.assertLessEqual(error, 0.001 * area)
+
+    def test_contained_shape(self):
+        area, error = union.get_covered_area([Triangle(3, 4, 5).place(0, 0), Square(1).place(0, 0, 0.3)])
+        self.assertLessEqual(abs(area - 6), error)
+
+    def test_empty(self):
+        self.assertEqual(union.get_covered_area([]), (0.0, 0.0))
+
+    def test_cached_bounds(self):
+        square = Square(2).place(1, 1)
+        self.assertIs(square.get_bounds(), square.get_bounds())
+        self.assertEqual(square._placement.bounds, (0, 0, 2, 2))
+        self.assertEqual(square.get_placement(), (1, 1, 0))
+
+    def test_placement_slot(self):
+        # placement, bounds and vertices share one slot, which is empty in shapes not placed
+        self.assertEqual(Shape.__slots__, ('_area', '_perimeter', '_placement'))
+        self.assertEqual(sys.getsizeof(RegularPentagon(1)), sys.getsizeof(Circle(1)))
+        self.assertLess(sys.getsizeof(Circle(1)), sys.getsizeof(Rectangle(1, 1)))
+
+
+class PolygonTester(unittest.TestCase):
+
+    def test_regular_polygon(self):
+        self.assertAlmostEqual(RegularPolygon(4, 3).get_area(), 9)
+        self.assertAlmostEqual(RegularPolygon(5, 2).get_area(), RegularPentagon(2).get_area())
+        self.assertEqual(RegularPolygon(6, 2).get_perimeter(), 12)
+        self.assertEqual(str(RegularPolygon(6, 2)), 'RegularPolygon, n = 6, a = 2')
+        for n in (2, 3.5):
+            with self.assertRaises(ValueError):
+                RegularPolygon(n, 1)
+
+    def test_regular_polygon_kernels(self):
+        n, a = [3, 6, 10], [1, 2, 0.5]
+        self.assertEqual(list(RegularPolygon.areas(n, a)), [RegularPolygon(k, x).get_area() for k, x in zip(n, a)])
+        self.assertEqual(list(RegularPolygon.perimeters(n, a)), [3, 12, 5])
+        self.assertEqual(RegularPentagon(2).n, 5)
+        self.assertEqual(RegularPentagon(2).get_dimensions(), (2,))
+
+    def test_polygon(self):
+        triangle = Polygon([(0, 0), (4, 0), (0, 3)])
+        self.assertEqual(triangle.get_area(), 6)
+        self.assertEqual(triangle.get_perimeter(), 12)
+        self.assertEqual(Polygon(array('d', [0, 0, 0, 3, 4, 0])), Polygon([(0, 0), (0, 3), (4, 0)]))
+        self.assertEqual(str(triangle), 'Polygon, vertices = 3')
+        with self.assertRaises(ValueError):
+            Polygon([(0, 0), (1, 1)])
+        with self.assertRaises(ValueError):
+            Polygon([(0, 0), (1, 1), (math.inf, 0)])
+
+    def test_polygon_kernels(self):
+        circle = [(math.cos(2 * math.pi * k / 1000), math.sin(2 * math.pi * k / 1000)) for k in range(1000)]
+        polygons = [Polygon(circle), Polygon([(0, 0), (2, 0), (2, 2), (0, 2)])]
+        areas = Polygon.areas([polygon.vertices for polygon in polygons])
+        self.assertAlmostEqual(areas[0], math.pi, 4)
+        self.assertEqual(areas[1], 4)
+        self.assertEqual(list(Polygon.perimeters([polygons[1].vertices])), [8])
+
+    def test_polygon_in_shape_list(self):
+        sl = ShapeList()
+        sl.add_shapes([Polygon([(0, 0), (10, 0), (0, 10)]), RegularPolygon(8, 1), Circle(1)])
+        self.assertEqual(sl.get_largest_shape_by_area(), sl.shapes[0])
+        self.assertEqual(sl.get_data_to_table()[2][1], 'RegularPolygon')
+
+    def test_concave_polygon(self):
+        u_shape = Polygon([(0, 0), (3, 0), (3, 3), (2, 3), (2, 1), (1, 1), (1, 3), (0, 3)])
+        self.assertIsNone(getattr(u_shape, 'convex', None))  # found only when needed
+        self.assertFalse(u_shape.is_convex())
+        self.assertIs(u_shape.place(0, 0).convex, False)
+        self.assertTrue(Polygon([(0, 0), (0, 1), (1, 0)]).is_convex())
+        star = Polygon([(0, 1), (0.588, -0.809), (-0.951, 0.309), (0.951, 0.309), (-0.588, -0.809)])
+        self.assertFalse(star.is_convex())
+        placed = u_shape.place(1.5, 1.5)
+        dx, dy = placed.get_vertices()[0]  # position of vertex (0, 0)
+        notch = (dx + 1.5, dy + 2)
+        self.assertFalse(placed.contains_point(*notch))
+        self.assertFalse(placed.overlaps(Square(0.5).place(*notch)))
+        self.assertFalse(Square(0.5).place(*notch).overlaps(placed))
+        self.assertTrue(placed.overlaps(Square(1.2).place(*notch)))
+        self.assertFalse(placed.overlaps(Circle(0.4).place(*notch)))
+        self.assertTrue(Circle(0.6).place(*notch).overlaps(placed))
+        area, error = union.get_covered_area([placed], max_depth=8)
+        self.assertLessEqual(abs(area - 7), error)
+        self.assertLess(error, 0.1)
+
+    def test_placed_polygon(self):
+        l_shape = Polygon([(0, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2)])
+        placed = l_shape.place(0, 0)  # centroid of the L is (5/6, 5/6)
+        self.assertTrue(placed.contains_point(-0.5, -0.5))
+        self.assertFalse(placed.contains_point(0.4, 0.4))
+
+
+class ShapeColumnsTester(unittest.TestCase):
+
+    def test_append(self):
+        sl = ShapeList()
+        sl.add_shape(Triangle(2, 4, 5))
+        sl.add_shape(Circle(3))
+        sl.add_shape(Triangle(3, 4, 5))
+        self.assertEqual([list(column) for column in sl.columns.columns[Triangle]],
+                         [[2, 3], [4, 4], [5, 5]])
+        self.assertEqual(list(sl.columns.columns[Circle][0]), [3])
+        self.assertEqual(len(sl.columns), 3)
+
+    def test_metric(self):
+        sl = ShapeList()
+        sl.add_shape(Rectangle(2, 3))
+        sl.add_shape(Rectangle(4, 5))
+        self.assertEqual(list(sl.columns.get_metric(Rectangle, 'area')), [6, 20])
+        self.assertEqual(list(sl.columns.get_metric(Rectangle, 'perimeter')), [10, 18])
+
+    def test_largest_tie(self):
+        sl = ShapeList()
+        s = Square(2)
+        r = Rectangle(1, 4)
+        sl.add_shape(s)
+        sl.add_shape(r)
+        self.assertIs(sl.get_largest_shape_by_area(), s)
+
+    def test_largest_empty(self):
+        self.assertIsNone(ShapeList().get_largest_shape_by_area())
+
+
+class LargestShapeIndexTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.small = Square(1)
+        self.big = Circle(3)
+        self.long = Rectangle(1, 20)
+        for shape in (self.small, self.big, self.long):
+            self.sl.add_shape(shape)
+
+    def test_running_maxima(self):
+        self.assertIs(self.sl.get_largest_shape_by_area(), self.big)
+        self.assertIs(self.sl.get_largest_shape_by_perimeter(), self.long)
+        bigger = Square(10)
+        self.sl.add_shape(bigger)
+        self.assertIs(self.sl.get_largest_shape_by_area(), bigger)
+
+    def test_remove_largest(self):
+        self.sl.remove_shape(self.big)
+        self.assertIs(self.sl.get_largest_shape_by_area(), self.long)
+        self.assertIs(self.sl.get_largest_shape_by_perimeter(), self.long)
+        self.assertNotIn(self.big, self.sl.shapes)
+        self.assertEqual(len(self.sl.columns), 2)
+
+    def test_remove_other(self):
+        self.sl.remove_shape(self.small)
+        self.assertIs(self.sl.get_largest_shape_by_area(), self.big)
+
+    def test_remove_all(self):
+        for shape in (self.small, self.big, self.long):
+            self.sl.remove_shape(shape)
+        self.assertIsNone(self.sl.get_largest_shape_by_area())
+
+    def test_failed_metric(self):
+        class Broken(Circle):
+            def get_perimeter(self):
+                raise OverflowError('math range error')
+
+        with self.assertRaises(OverflowError):
+            self.sl.add_shape(Broken(1))
+        with self.assertRaises(OverflowError):
+            self.sl.add_shapes([Square(2), Broken(1)])
+        self.assertEqual(len(self.sl.shapes), 3)
+        self.assertEqual(len(self.sl.columns), 3)
+        self.assertEqual(self.sl.count_by_class(), {'Square': 1, 'Circle': 1, 'Rectangle': 1})
+        self.assertIs(self.sl.get_largest_shape_by_area(), self.big)
+
+    def test_zero_metrics(self):
+        sl = ShapeList()
+        point, segment = Circle(0), Triangle(1, 2, 3)
+        sl.add_shapes([point, segment])
+        self.assertIs(sl.get_largest_shape_by_area(), point)
+        self.assertIs(sl.get_largest_shape_by_perimeter(), segment)
+        self.assertEqual(sl.find_largest('area'), (0, point))
+        sl.remove_shape(point)
+        self.assertIs(sl.get_largest_shape_by_area(), segment)
+
+    def test_remove_missing(self):
+        with self.assertRaises(ValueError):
+            self.sl.remove_shape(Circle(100))
+
+
+class ShapeQueryTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.squares = [Square(a) for a in (3, 1, 4, 1, 5)]
+        for shape in self.squares:
+            self.sl.add_shape(shape)
+        self.sl.add_shape(Circle(1))
+
+    def test_top_shapes(self):
+        self.assertEqual(self.sl.get_top_shapes(2), [Square(5), Square(4)])
+        smallest = self.sl.get_top_shapes(2, largest=False)
+        self.assertIs(smallest[0], self.squares[1])
+        self.assertIs(smallest[1], self.squares[3])
+        self.assertEqual(self.sl.get_top_shapes(0), [])
+        self.assertEqual(self.sl.get_top_shapes(-1), [])
+        self.assertEqual(self.sl.get_top_shapes(-1, largest=False), [])
+        self.assertEqual(len(self.sl.get_top_shapes(10, largest=False)), 6)
+
+    def test_index_maintained(self):
+        self.sl.get_top_shapes(1)
+        self.sl.add_shape(Square(10))
+        self.sl.remove_shape(self.squares[4])
+        self.assertEqual(self.sl.get_top_shapes(2), [Square(10), Square(4)])
+        self.assertEqual(len(self.sl.get_index('area')), 6)
+
+    def test_top_shapes_ties(self):
+        sl = ShapeList()
+        sl.add_shapes([Square(2), Rectangle(1, 4), Circle(1)])
+        self.assertIs(sl.get_top_shapes(1)[0], sl.get_largest_shape_by_area())
+        self.assertEqual(sl.get_top_shapes(3), [Square(2), Rectangle(1, 4), Circle(1)])
+
+    def test_remove_large_integers(self):
+        square = Square(2**60 + 1)
+        self.sl.add_shape(square)
+        self.sl.get_top_shapes(1)
+        self.sl.get_top_shapes(1, 'perimeter')
+        self.sl.remove_shape(square)
+        self.assertEqual(len(self.sl.get_index('area')), len(self.sl.shapes))
+        self.assertEqual(len(self.sl.get_index('perimeter')), len(self.sl.shapes))
+
+    def test_remove_failed(self):
+        index = self.sl.get_index('area')
+        with mock.patch.object(index, 'find', side_effect=ValueError('Shape is not in index!')):
+            with self.assertRaises(ValueError):
+                self.sl.remove_shape(self.squares[0])
+        self.assertEqual(len(self.sl.shapes), 6)
+        self.assertEqual(len(self.sl.columns), 6)
+        self.assertEqual(self.sl.count_by_class(), {'Square': 5, 'Circle': 1})
+        self.assertEqual(len(index), 6)
+
+    def test_range(self):
+        self.assertEqual(self.sl.get_shapes_in_range(1, 9),
+                         [Square(1), Square(1), Circle(1), Square(3)])
+        self.assertEqual(self.sl.get_shapes_in_range(12, 16, 'perimeter'), [Square(3), Square(4)])
+
+    def test_percentile(self):
+        self.assertEqual(self.sl.get_percentile(50), math.pi)
+        self.assertEqual(self.sl.get_percentile(100), 25)
+        self.assertEqual(self.sl.get_percentile(0), 1)
+        self.assertIsNone(ShapeList().get_percentile(95))
+        with self.assertRaises(ValueError):
+            self.sl.get_percentile(101)
+
+    def test_count_by_class(self):
+        self.sl.remove_shape(Circle(1))
+        self.assertEqual(self.sl.count_by_class(), {'Square': 5})
+
+
+class ShapesTableTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.sl.add_shape(Circle(3))
+        self.sl.add_shape(Square(2))
+        self.data = self.sl.get_data_to_table()
+
+    def test_widths(self):
+        data = [['idx', 'x'], ['10', 'long cell']]
+        self.assertEqual(self.sl.find_column_widths(data), [3, 9])
+
+    def test_same_as_row_drawing(self):
+        lines = self.sl.format_table(self.data).split('\n')
+        self.assertEqual(len(lines), 2 * len(self.data) + 1)
+        for row, line in zip(self.data, lines[1::2]):
+            self.assertEqual(line, self.sl.draw_data_row(self.data, row))
+        self.assertEqual(lines[0], self.sl.draw_out_row(self.data, self.data[0]))
+
+    def test_content(self):
+        table = self.sl.format_table(self.data)
+        self.assertIn('| Circle |', table)
+        self.assertIn('28.27', table)
+        self.assertIn('Square, a = 2', table)
+
+
+class StreamingTableTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        for r in range(1, 13):
+            self.sl.add_shape(Circle(r))
+
+    def test_same_as_table(self):
+        table = self.sl.format_table(self.sl.get_data_to_table())
+        self.assertEqual('\n'.join(self.sl.iter_table_lines()), table)
+
+    def test_page(self):
+        rows = list(self.sl.iter_data_rows(offset=10, limit=5))
+        self.assertEqual([row[0] for row in rows], [10, 11])
+        self.assertEqual(rows[0][2], 'Circle, r = 11')
+        lines = list(self.sl.iter_table_lines(offset=3, limit=2))
+        self.assertEqual(len(lines), 7)
+        self.assertIn('Circle, r = 4', lines[3])
+
+    def test_write_table(self):
+        output = io.StringIO()
+        self.sl.write_table(output, page_size=4)
+        self.assertEqual(output.getvalue(), '\n'.join(self.sl.iter_table_lines()) + '\n')
+
+    def test_int_dimensions(self):
+        sl = ShapeList()
+        sl.add_shapes([Square(3), Square(4), Rectangle(2, 5)])
+        rows = list(sl.iter_data_rows())
+        self.assertEqual(rows[0][5], '9.00')
+        self.assertEqual(list(sl.iter_data_rows(1, 1)), rows[1:2])
+        lines = list(sl.iter_table_lines())
+        self.assertEqual(len({len(line) for line in lines if line.startswith('|')}), 1)
+        self.assertEqual('\n'.join(lines), sl.format_table(sl.get_data_to_table()))
+        self.assertEqual(cli.run_command(sl, 'table')[:1], cli.run_command(sl, 'table 0 1'))
+
+    def test_given_widths(self):
+        widths = [3, 6, 14, 9, 12, 6, 9]
+        lines = list(self.sl.iter_table_lines(limit=1, widths=widths))
+        self.assertEqual(lines[0], '-' * (sum(widths) + 3 * len(widths)))
+
+
+class LoaderTester(unittest.TestCase):
+
+    def test_csv(self):
+        sl = ShapeList()
+        file = io.StringIO('kind,a,b,c\nCircle,3\nTriangle,3,4,5\nSquare,2.5\n')
+        report = loader.load_shapes(sl, file, 'csv', chunk_size=2)
+        self.assertEqual(report.loaded, 3)
+        self.assertEqual(sl.shapes, [Circle(3), Triangle(3, 4, 5), Square(2.5)])
+
+    def test_jsonl(self):
+        sl = ShapeList()
+        file = io.StringIO('{"kind": "Rectangle", "a": 2, "b": 3}\n\n{"kind": "Circle", "r": 1.5}\n')
+        loader.load_shapes(sl, file, 'jsonl')
+        self.assertEqual(sl.shapes, [Rectangle(2, 3), Circle(1.5)])
+
+    def test_bad_rows(self):
+        sl = ShapeList()
+        file = io.StringIO('Circle,-1\nBlob,2\nSquare,x\nRectangle,1\nCircle,2\n')
+        report = loader.load_shapes(sl, file, 'csv')
+        self.assertEqual(report.loaded, 1)
+        self.assertEqual([line for line, message in report.errors], [1, 2, 3, 4])
+        self.assertEqual(report.errors[0][1], 'Number below 0!!')
+
+    def test_arithmetic_errors(self):
+        sl = ShapeList()
+        file = io.StringIO('Circle,1\nRegularPolygon,5,1\nRegularPentagon,1e200\nSquare,2\n')
+        with mock.patch.object(RegularPolygon, 'get_area', side_effect=OverflowError('math range error')):
+            report = loader.load_shapes(sl, file, 'csv', chunk_size=2)
+        self.assertEqual(sl.shapes, [Circle(1), Square(2)])
+        self.assertEqual(report.errors, [(2, 'math range error'), (3, 'Number is too large!')])
+
+    def test_bad_json(self):
+        file = io.StringIO('{"kind": "Square"}\n[1]\nnope\n')
+        report = loader.load_shapes(ShapeList(), file, 'jsonl')
+        self.assertEqual(len(report.errors), 3)
+
+    def test_add_shapes_type_error(self):
+        sl = ShapeList()
+        with self.assertRaises(TypeError):
+            sl.add_shapes([Circle(1), 'circle'])
+        self.assertEqual(sl.shapes, [])
+
+
+class StorageTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.sl.add_shapes([Circle(3), Triangle(3, 4, 5), Square(2.5), Circle(1), RegularPentagon(2), Rectangle(1, 20)])
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'shapes.geom')
+        storage.save(self.sl, self.path)
+
+    def test_round_trip(self):
+        self.assertEqual(storage.load(self.path).shapes, self.sl.shapes)
+
+    def test_mapped_queries(self):
+        with storage.MappedShapes(self.path) as mapped:
+            self.assertEqual(len(mapped), 6)
+            self.assertEqual(mapped.get_largest_shape_by_area(), Circle(3))
+            self.assertEqual(mapped.get_largest_shape_by_perimeter(), Rectangle(1, 20))
+            self.assertEqual(list(mapped.get_metric(Circle, 'area')), [9 * math.pi, math.pi])
+            self.assertEqual(list(mapped.iter_shapes(2, 2)), [Square(2.5), Circle(1)])
+
+    def test_table_page(self):
+        with storage.MappedShapes(self.path) as mapped:
+            lines = mapped.get_table_page(3, 1).split('\n')
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[3].startswith('|  3  |'))
+
+    def test_bad_file(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'x' * 64)
+        with self.assertRaises(ValueError):
+            storage.MappedShapes(self.path)
+
+    def test_truncated_file(self):
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        for size in (0, 10, 40, len(data) - 8):
+            with open(self.path, 'wb') as file:
+                file.write(data[:size])
+            with self.assertRaises(ValueError):
+                storage.MappedShapes(self.path)
+
+    def test_unknown_kind(self):
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        for name in (b'Blob\0\0', b'Circl\xff'):
+            with open(self.path, 'wb') as file:
+                file.write(data.replace(b'Circle', name))
+            with self.assertRaises(ValueError):
+                storage.load(self.path)
+
+    def test_zero_metrics(self):
+        sl = ShapeList()
+        sl.add_shapes([Square(0), Circle(0)])
+        storage.save(sl, self.path)
+        with storage.MappedShapes(self.path) as mapped:
+            self.assertEqual(mapped.find_largest('area'), (0, Square(0)))
+
+
+class ParallelEvaluatorTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        for a in range(1, 30):
+            self.sl.add_shapes([Square(a % 7), Circle(a % 5), Triangle(3, 4, 5), Rectangle(a % 3, 9)])
+
+    def test_threads(self):
+        with ThreadPoolExecutor(4) as executor:
+            evaluator = ParallelEvaluator(executor=executor, chunk_size=4)
+            self.assertIs(evaluator.get_largest_shape_by_area(self.sl), self.sl.get_largest_shape_by_area())
+            self.assertIs(evaluator.get_largest_shape_by_perimeter(self.sl),
+                          self.sl.get_largest_shape_by_perimeter())
+            self.assertEqual(evaluator.get_data_to_table(self.sl), self.sl.get_data_to_table())
+            total = math.fsum(self.sl.columns.iter_metric(self.sl.shapes, 'area'))
+            self.assertAlmostEqual(evaluator.get_total(self.sl, 'area'), total)
+
+    def test_processes(self):
+        with ParallelEvaluator(2, chunk_size=10) as evaluator:
+            self.assertEqual(evaluator.find_largest(self.sl, 'area'), self.sl.find_largest('area'))
+
+    def test_empty(self):
+        with ThreadPoolExecutor(2) as executor:
+            evaluator = ParallelEvaluator(executor=executor)
+            self.assertEqual(evaluator.find_largest(ShapeList(), 'area'), (0, None))
+            self.assertEqual(evaluator.get_total(ShapeList(), 'perimeter'), 0)
+
+    def test_exact_maxima(self):
+        sl = ShapeList()
+        small, big = Square(2 ** 60), Square(2 ** 60 + 1)  # equal as float64
+        sl.add_shapes([Square(2 ** 61), small, big])
+        sl.remove_shape(sl.shapes[0])  # maxima are found again after removing the largest
+        self.assertEqual(sl.find_largest('area'), ((2 ** 60 + 1) ** 2, big))
+        with ThreadPoolExecutor(2) as executor:
+            evaluator = ParallelEvaluator(executor=executor, chunk_size=1)
+            self.assertEqual(evaluator.find_largest(sl, 'area'), sl.find_largest('area'))
+            self.assertEqual(evaluator.find_largest(sl, 'perimeter'), sl.find_largest('perimeter'))
+
+
+class PipelineTester(unittest.TestCase):
+
+    def test_aggregate_file(self):
+        file = io.StringIO('Circle,1\nSquare,2\nSquare,-2\nTriangle,3,4,5\nSquare,3\nBlob,1\n')
+        report = loader.LoadReport()
+        aggregate = pipeline.aggregate_file(file, 'csv', batch_size=2, report=report)
+        self.assertEqual(aggregate.count, 4)
+        self.assertEqual(report.loaded, 4)
+        self.assertEqual([line for line, message in report.errors], [3, 6])
+        self.assertEqual(aggregate.class_counts, {'Circle': 1, 'Square': 2, 'Triangle': 1})
+        self.assertAlmostEqual(aggregate.totals['area'], math.pi + 4 + 6 + 9)
+        self.assertAlmostEqual(aggregate.totals['perimeter'], 2 * math.pi + 8 + 12 + 12)
+        self.assertEqual(aggregate.largest['area'], (9, Square(3)))
+
+    def test_batches(self):
+        records = [(Circle, [1]), (Square, [2]), (Circle, [3])]
+        batches = list(pipeline.iter_batches(records, batch_size=2))
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(list(batches[0][Circle][0]), [1])
+        self.assertEqual(list(batches[1][Circle][0]), [3])
+
+    def test_merge(self):
+        first = pipeline.aggregate_records([(Square, [2]), (Circle, [1])])
+        second = pipeline.aggregate_records([(Square, [1]), (Rectangle, [1, 10])])
+        first.merge(second)
+        summary = first.to_dict()
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['class_counts'], {'Square': 2, 'Circle': 1, 'Rectangle': 1})
+        self.assertEqual(summary['largest_perimeter'], 22)
+        self.assertEqual(summary['largest_area'], 10)
+
+    def test_zero_metrics(self):
+        aggregate = pipeline.aggregate_records([(Circle, [0]), (Square, [0])])
+        self.assertEqual(aggregate.largest['area'], (0, Circle(0)))
+        empty = pipeline.aggregate_records([])
+        self.assertEqual(empty.to_dict()['largest_area_shape'], None)
+        empty.merge(aggregate)
+        self.assertEqual(empty.largest['area'], (0, Circle(0)))
+        self.assertIsNotNone(empty.to_dict()['largest_area_shape'])
+
+
+class BatchModeTester(unittest.TestCase):
+
+    def test_load_menu(self):
+        self.assertTrue(cli.shows_menu(cli.parse_args(['load', 'a.csv'])))
+        for args in (['load', '-'], ['load', 'a.csv', '--save', 'a.geom'], ['load', 'a.csv', '--no-menu']):
+            self.assertFalse(cli.shows_menu(cli.parse_args(args)))
+
+    def test_menu_end_of_input(self):
+        with mock.patch('builtins.input', side_effect=EOFError), mock.patch('builtins.print'):
+            cli.main()
+
+    def run_batch(self, script, **kwargs):
+        output = io.StringIO()
+        errors = cli.run_batch(io.StringIO(script), output=output, **kwargs)
+        return errors, output.getvalue()
+
+    def test_json(self):
+        errors, output = self.run_batch('add Square 2\n\n# comment\nadd Circle 1\nlargest perimeter\ncount\n')
+        results = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(errors, 0)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[2]['result']['shape'], 'Square, a = 2')
+        self.assertEqual(results[3]['result'], {'total': 2, 'classes': {'Square': 1, 'Circle': 1}})
+
+    def test_errors(self):
+        errors, output = self.run_batch('add Square -2\nlargest volume\nformula Blob\njump\nadd Circle\n')
+        results = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(errors, 5)
+        self.assertEqual(results[0]['error'], 'Number below 0!!')
+        self.assertFalse(any(result['ok'] for result in results))
+
+    def test_arithmetic_errors(self):
+        script = 'add Circle 1\nadd RegularPentagon 1e200\nadd RegularPolygon 5 1\ncount\n'
+        with mock.patch.object(RegularPolygon, 'get_perimeter', side_effect=OverflowError('math range error')):
+            errors, output = self.run_batch(script)
+        results = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(errors, 2)
+        self.assertEqual(results[1]['error'], 'Number is too large!')
+        self.assertEqual(results[2]['error'], 'math range error')
+        self.assertEqual(results[3]['result'], {'total': 1, 'classes': {'Circle': 1}})
+
+    def test_type_error_in_command(self):
+        def count(shapes):
+            raise TypeError('Shape is not ancestor!')
+
+        with mock.patch.dict(cli.COMMANDS, {'count': count}):
+            errors, output = self.run_batch('count\ncount all\n')
+        results = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(errors, 2)
+        self.assertEqual(results[0]['error'], 'Shape is not ancestor!')
+        self.assertEqual(results[1]['error'], 'Wrong arguments of command: count all')
+
+    def test_csv_timing(self):
+        errors, output = self.run_batch('formula Circle\ntable\n', output_format='csv', timing=True)
+        rows = list(csv.reader(io.StringIO(output)))
+        self.assertEqual(rows[0], ['command', 'ok', 'result', 'seconds'])
+        self.assertEqual(json.loads(rows[1][2])['perimeter'], Circle.get_perimeter_formula())
+        self.assertEqual(rows[2][2], '[]')
+        self.assertGreaterEqual(float(rows[2][3]), 0)
+
+
+class ShapeServerTester(unittest.TestCase):
+
+    async def talk(self, server, requests):
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        responses = []
+        for request in requests:
+            writer.write((request if isinstance(request, str) else json.dumps(request)).encode() + b'\n')
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        await writer.wait_closed()
+        return responses
+
+    async def session(self):
+        shape_server = ShapeServer()
+        server = await shape_server.start('127.0.0.1', 0)
+        async with server:
+            first, second = await asyncio.gather(
+                self.talk(server, [{'command': 'add Circle 3'}, {'command': 'add Square -1'}]),
+                self.talk(server, [{'command': 'batch', 'shapes': [['Square', 10], ['Blob'], ['Triangle', 3, 4, 5]]},
+                                   'not json', {'command': 'formula Square'}]))
+            third = await self.talk(server, [{'command': 'largest area'}, {'command': 'table 0 1'},
+                                             {'command': 'count'}])
+        return first, second, third, shape_server
+
+    def test_session(self):
+        first, second, third, shape_server = asyncio.run(self.session())
+        self.assertTrue(first[0]['ok'])
+        self.assertEqual(first[1], {'ok': False, 'error': 'Number below 0!!'})
+        self.assertEqual(second[0]['result']['added'], 2)
+        self.assertEqual(second[0]['result']['errors'][0]['index'], 1)
+        self.assertFalse(second[1]['ok'])
+        self.assertEqual(second[2]['result']['area'], 'a^2')
+        self.assertEqual(third[0]['result']['shape'], 'Square, a = 10')
+        self.assertEqual(len(third[1]['result']), 1)
+        self.assertEqual(third[2]['result']['total'], 3)
+        self.assertEqual(len(shape_server.shapes.shapes), 3)
+
+    async def arithmetic_errors(self):
+        shape_server = ShapeServer()
+        server = await shape_server.start('127.0.0.1', 0)
+        async with server:
+            with mock.patch.object(RegularPolygon, 'get_area', side_effect=OverflowError('math range error')):
+                return await self.talk(server, [
+                    {'command': 'add RegularPolygon 5 1'},
+                    {'command': 'batch', 'shapes': [['Circle', 1], ['RegularPolygon', 5, 1], ['Square', 2]]},
+                    {'command': 'count'}])
+
+    def test_arithmetic_errors(self):
+        single, batch, count = asyncio.run(self.arithmetic_errors())
+        self.assertEqual(single, {'ok': False, 'error': 'math range error'})
+        self.assertEqual(batch['result'], {'added': 2, 'errors': [{'index': 1, 'message': 'math range error'}]})
+        self.assertEqual(count['result']['total'], 2)
+
+    async def long_lines(self):
+        batch = {'command': 'batch', 'shapes': [['Circle', i % 100 + 1] for i in range(10000)]}
+        shape_server = ShapeServer()
+        server = await shape_server.start('127.0.0.1', 0)
+        async with server:
+            big = await self.talk(server, [batch])
+        small_server = await ShapeServer().start('127.0.0.1', 0, limit=1024)
+        async with small_server:
+            too_long = await self.talk(small_server, [batch])
+        return big, too_long
+
+    def test_long_lines(self):
+        big, too_long = asyncio.run(self.long_lines())
+        self.assertEqual(big[0]['result']['added'], 10000)
+        self.assertFalse(too_long[0]['ok'])
+
+
+class ConcurrentShapeListTester(unittest.TestCase):
+
+    def test_queries(self):
+        sl = ConcurrentShapeList()
+        small, big, long = Square(1), Circle(3), Rectangle(1, 20)
+        sl.add_shapes([small, big, long])
+        self.assertEqual(len(sl), 3)
+        self.assertIs(sl.get_largest_shape_by_area(), big)
+        self.assertIs(sl.get_largest_shape_by_perimeter(), long)
+        with self.assertRaises(TypeError):
+            sl.add_shape('square')
+        self.assertEqual(sl.get_shapes(), [small, big, long])
+
+    def test_remove(self):
+        sl = ConcurrentShapeList()
+        sl.add_shapes([Square(1), Circle(3)])
+        before = sl.get_shapes()
+        sl.remove_shape(Circle(3))
+        self.assertEqual(sl.get_largest_shape_by_area(), Square(1))
+        self.assertEqual(before, [Square(1), Circle(3)])
+        self.assertEqual(sl.snapshot().shapes, [Square(1)])
+        with self.assertRaises(ValueError):
+            sl.remove_shape(Circle(3))
+
+    def test_zero_metrics(self):
+        sl = ConcurrentShapeList()
+        sl.add_shapes([Circle(0), Square(0)])
+        self.assertEqual(sl.get_largest_shape_by_area(), Circle(0))
+        sl.remove_shape(Circle(0))
+        self.assertEqual(sl.get_largest_shape_by_area(), Square(0))
+
+    def test_threads(self):
+        sl = ConcurrentShapeList()
+        snapshots = []
+
+        def write(start):
+            for a in range(start, start + 500):
+                sl.add_shape(Square(a))
+
+        def read():
+            for i in range(200):
+                shapes = sl.get_shapes()
+                largest = sl.get_largest_shape_by_area()
+                snapshots.append(shapes)
+                self.assertTrue(largest is None or largest.a >= 0)
+
+        threads = [threading.Thread(target=write, args=(start,)) for start in (0, 500, 1000, 1500)]
+        threads += [threading.Thread(target=read) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(sl), 2000)
+        self.assertEqual(sl.get_largest_shape_by_area(), Square(1999))
+        self.assertEqual(sl.snapshot().get_data_to_table()[-1][0], 1999)
+        for shapes in snapshots:
+            self.assertEqual(len(set(shapes)), len(shapes))
+
+
+class ShapeInternerTester(unittest.TestCase):
+
+    def test_shared(self):
+        interner = ShapeInterner()
+        circle = interner.get(Circle, 3)
+        self.assertIs(interner.get(Circle, 3), circle)
+        self.assertEqual(circle._area, Circle(3).get_area())
+        self.assertIsNot(interner.get(Circle, 3.0), circle)
+        self.assertIsNot(interner.get(Square, 3), interner.get(Rectangle, 3, 3))
+        self.assertEqual(interner.get_stats()['hits'], 1)
+
+    def test_intern(self):
+        interner = ShapeInterner()
+        square = Square(2)
+        self.assertIs(interner.intern(square), square)
+        self.assertIs(interner.intern(Square(2)), square)
+        self.assertIsNot(interner.intern(Square(2).place(1, 1)), square)
+
+    def test_eviction(self):
+        interner = ShapeInterner(maxsize=2)
+        first = interner.get(Circle, 1)
+        interner.get(Circle, 2)
+        interner.get(Circle, 1)
+        interner.get(Circle, 3)  # Circle(2) is the least recently used
+        self.assertEqual(len(interner), 2)
+        self.assertIs(interner.get(Circle, 1), first)
+        stats = interner.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (2, 3, 1))
+        self.assertEqual(stats['hit_rate'], 0.4)
+
+    def test_invalid(self):
+        interner = ShapeInterner()
+        with self.assertRaises(ValueError):
+            interner.get(Circle, -1)
+        self.assertEqual(len(interner), 0)
+
+    def test_loader(self):
+        sl = ShapeList()
+        interner = ShapeInterner()
+        loader.load_shapes(sl, io.StringIO('Circle,3\nCircle,3\nSquare,2\nCircle,3\n'), 'csv', interner=interner)
+        self.assertIs(sl.shapes[0], sl.shapes[3])
+        self.assertEqual(interner.get_stats()['size'], 2)
+        sl.remove_shape(sl.shapes[1])
+        self.assertEqual(sl.get_data_to_table()[1][3], sl.get_data_to_table()[3][3])
+
+
+class BenchTester(unittest.TestCase):
+
+    def test_run(self):
+        results = bench.run_benchmarks([12], repeat=1, name_filter='ShapeList')
+        self.assertIn('ShapeList.format_table[12]', results)
+        self.assertNotIn('Circle.get_area[12]', results)
+        self.assertGreaterEqual(results['ShapeList.add_shape[12]']['seconds'], 0)
+
+    def test_compare(self):
+        baseline = {'a[1]': {'seconds': 1.0}, 'b[1]': {'seconds': 1.0}}
+        results = {'a[1]': {'seconds': 1.05}, 'b[1]': {'seconds': 2.0}, 'c[1]': {'seconds': 9.0}}
+        self.assertEqual(bench.compare(results, baseline, 0.1), [('b[1]', 1.0, 2.0, 2.0)])
+
+
+class InstrumentationTester(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        original = Circle.get_area
+        instrumentation = Instrumentation()
+        with instrumentation:
+            self.assertIsNot(Circle.get_area, original)
+        self.assertIs(Circle.get_area, original)
+
+    def test_stats(self):
+        instrumentation = Instrumentation()
+        with instrumentation:
+            sl = ShapeList()
+            sl.add_shape(Circle(2))
+            sl.add_shape(Square(3))
+            str(Circle(1))
+            sl.get_largest_shape_by_area()
+        Circle(5).get_area()
+        stats = instrumentation.snapshot()
+        self.assertEqual(stats['ShapeList.add_shape']['count'], 2)
+        self.assertEqual(stats['Circle.get_area']['count'], 1)
+        self.assertEqual(stats['Rectangle.get_area']['count'], 1)
+        self.assertEqual(stats['Circle.__str__']['count'], 1)
+        self.assertEqual(sum(stats['ShapeList.add_shape']['histogram'].values()), 2)
+        self.assertNotIn('ShapeList.format_table', stats)
+
+    def test_prometheus(self):
+        instrumentation = Instrumentation([(ShapeList, 'add_shape')])
+        with instrumentation:
+            ShapeList().add_shape(Circle(1))
+        text = instrumentation.to_prometheus()
+        self.assertIn('# TYPE geometry_call_duration_seconds histogram', text)
+        self.assertIn('geometry_call_duration_seconds_bucket{method="ShapeList.add_shape",le="+Inf"} 1', text)
+        self.assertIn('geometry_call_duration_seconds_count{method="ShapeList.add_shape"} 1', text)
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot(), {})
+
+
 class UMLdiagramTester(unittest.TestCase):
 
     def test_file_existence(self):
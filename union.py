@@ -0,0 +1,180 @@
+import math
+from geometry import Circle, Rectangle, iter_edges, segments_intersect
+
+
+def is_axis_aligned(shape):
+    '''
+    Returns:
+        aligned - bool, True if placed shape is rectangle with sides parallel to the axes
+    '''
+
+    return isinstance(shape, Rectangle) and shape.check_placement()[2] % (math.pi / 2) == 0
+
+
+def get_boxes_area(boxes):
+    '''
+    Calculate exact area of union of boxes: sweep line over x with segment tree
+    of covered lengths over sorted y coordinates.
+
+    Args:
+        boxes - list of tuples (xmin, ymin, xmax, ymax)
+
+    Returns:
+        area - float
+    '''
+
+    ys = sorted({y for box in boxes for y in (box[1], box[3])})
+    if len(ys) < 2:
+        return 0.0
+    positions = {y: position for position, y in enumerate(ys)}
+    events = sorted([(xmin, 1, ymin, ymax) for xmin, ymin, xmax, ymax in boxes] +
+                    [(xmax, -1, ymin, ymax) for xmin, ymin, xmax, ymax in boxes])
+
+    size = len(ys) - 1  # number of elementary segments [ys[i], ys[i + 1]]
+    counts = [0] * (4 * size)  # number of boxes covering the whole node
+    covered = [0.0] * (4 * size)  # covered length inside the node
+
+    def update(node, low, high, first, last, delta):
+        if last < low or high < first:
+            return
+        if first <= low and high <= last:
+            counts[node] += delta
+        else:
+            middle = (low + high) // 2
+            update(2 * node, low, middle, first, last, delta)
+            update(2 * node + 1, middle + 1, high, first, last, delta)
+        if counts[node]:
+            covered[node] = ys[high + 1] - ys[low]
+        elif low == high:
+            covered[node] = 0.0
+        else:
+            covered[node] = covered[2 * node] + covered[2 * node + 1]
+
+    parts = []
+    previous = events[0][0]
+    for x, delta, ymin, ymax in events:
+        parts.append((x - previous) * covered[1])
+        previous = x
+        if ymin < ymax:
+            update(1, 0, size - 1, positions[ymin], positions[ymax] - 1, delta)
+
+    return math.fsum(parts)
+
+
+def contains_box(shape, box):
+    '''
+    Check if box lies inside shape. Convex shape contains box if it contains all corners
+    of the box. Border of concave shape must not touch the box either (box touched
+    by the border is treated as not contained, which only makes tiling go deeper).
+
+    Returns:
+        contained - bool
+    '''
+
+    xmin, ymin, xmax, ymax = box
+    corners = ((xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax))
+    if not all(shape.contains_point(x, y) for x, y in corners):
+        return False
+    if shape.is_convex():
+        return True
+    box_edges = list(iter_edges(corners))
+    for p1, p2 in iter_edges(shape.get_vertices()):
+        if max(p1[0], p2[0]) < xmin or min(p1[0], p2[0]) > xmax or max(p1[1], p2[1]) < ymin or min(p1[1], p2[1]) > ymax:
+            continue
+        if xmin <= p1[0] <= xmax and ymin <= p1[1] <= ymax:
+            return False
+        if any(segments_intersect(p1, p2, q1, q2) for q1, q2 in box_edges):
+            return False
+    return True
+
+
+def intersects_box(shape, box):
+    '''
+    Returns:
+        intersects - bool, True if shape and box have common points
+    '''
+
+    xmin, ymin, xmax, ymax = box
+    bounds = shape.get_bounds()
+    if bounds[0] > xmax or xmin > bounds[2] or bounds[1] > ymax or ymin > bounds[3]:
+        return False
+    if isinstance(shape, Circle):
+        x, y, rotation = shape.get_placement()
+        return (min(max(x, xmin), xmax) - x)**2 + (min(max(y, ymin), ymax) - y)**2 <= shape.r**2
+    if is_axis_aligned(shape):
+        return True
+    return shape.overlaps(Rectangle(xmax - xmin, ymax - ymin).place((xmin + xmax) / 2, (ymin + ymax) / 2))
+
+
+def split_box(box):
+    '''
+    Returns:
+        boxes - list of four quarters of the box
+    '''
+
+    xmin, ymin, xmax, ymax = box
+    x, y = (xmin + xmax) / 2, (ymin + ymax) / 2
+    return [(xmin, ymin, x, y), (x, ymin, xmax, y), (xmin, y, x, ymax), (x, y, xmax, ymax)]
+
+
+def get_tiled_area(shapes, relative_error=0.001, max_depth=12):
+    '''
+    Estimate area of union of shapes with adaptive tiling. The bounding box of all shapes
+    is split into tiles, level by level. Tile covered by one of the shapes is counted whole,
+    tile missed by all shapes is dropped, only the remaining (mixed) tiles are split again.
+    Every mixed tile is counted as half covered, so the error is at most half of their area.
+
+    Args:
+        shapes - list of placed shapes
+        relative_error - float, splitting stops when error is at most this part of the area
+        max_depth - int, max number of levels of splitting
+
+    Returns:
+        (area, error) - tuple of floats, real area lies between area - error and area + error
+    '''
+
+    if not shapes:
+        return 0.0, 0.0
+    bounds = [shape.get_bounds() for shape in shapes]
+    box = (min(b[0] for b in bounds), min(b[1] for b in bounds), max(b[2] for b in bounds), max(b[3] for b in bounds))
+    full = []  # areas of covered tiles
+    mixed = [(box, shapes)]  # tiles to check, with shapes which may touch them
+    depth = 0
+    while True:
+        next_mixed = []
+        for tile, candidates in mixed:
+            tile_area = (tile[2] - tile[0]) * (tile[3] - tile[1])
+            touching = [shape for shape in candidates if intersects_box(shape, tile)]
+            if not touching or not tile_area:
+                continue
+            if any(contains_box(shape, tile) for shape in touching):
+                full.append(tile_area)
+            else:
+                next_mixed.append((tile, touching))
+        mixed_area = math.fsum((tile[2] - tile[0]) * (tile[3] - tile[1]) for tile, candidates in next_mixed)
+        area = math.fsum(full) + mixed_area / 2
+        if depth == max_depth or mixed_area / 2 <= relative_error * area:
+            return area, mixed_area / 2
+        mixed = [(quarter, candidates) for tile, candidates in next_mixed for quarter in split_box(tile)]
+        depth += 1
+
+
+def get_covered_area(shapes, relative_error=0.001, max_depth=12):
+    '''
+    Calculate area covered by placed shapes, counting overlapping parts once.
+    Union of axis-aligned rectangles is calculated exactly, other shapes are tiled.
+
+    Args:
+        shapes - iterable of placed shapes, e.g. ShapeList.shapes
+        relative_error - float, allowed error of tiling as part of the area
+        max_depth - int, max number of levels of tiling
+
+    Returns:
+        (area, error) - tuple of floats, real area lies between area - error and area + error
+    '''
+
+    shapes = list(shapes)
+    if all(map(is_axis_aligned, shapes)):
+        return get_boxes_area([shape.get_bounds() for shape in shapes]), 0.0
+
+    return get_tiled_area(shapes, relative_error, max_depth)